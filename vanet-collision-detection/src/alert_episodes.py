@@ -0,0 +1,130 @@
+import numpy as np
+from collections import namedtuple
+
+# Episode event labels indexed by their integer event code
+EPISODE_EVENTS = ("OPEN", "ESCALATE", "CLOSE")
+OPEN, ESCALATE, CLOSE = range(len(EPISODE_EVENTS))
+
+# Alert delivery modes: every detection of every step, or one event per episode change
+ALERT_MODES = ("raw", "episodes")
+
+# One change of an alert episode. time is the simulation time of the event, start the time
+# the episode opened; ttc, distance and severity are the values of the step that caused the
+# event (the last detection for CLOSE) and min_ttc/max_severity the extremes over the episode.
+# Severities are indices into SEVERITY_LEVELS.
+EpisodeEvent = namedtuple("EpisodeEvent", ("event", "time", "vehicle1", "vehicle2", "start", "ttc",
+                                           "min_ttc", "distance", "severity", "max_severity", "steps"))
+
+class _Episode:
+    """State of one open episode"""
+    __slots__ = ("vehicle1", "vehicle2", "start", "last_step", "ttc", "min_ttc", "distance",
+                 "severity", "max_severity", "steps")
+
+    def __init__(self, vehicle1, vehicle2, start, step, ttc, distance, severity):
+        self.vehicle1 = vehicle1
+        self.vehicle2 = vehicle2
+        self.start = start
+        self.last_step = step
+        self.ttc = self.min_ttc = ttc
+        self.distance = distance
+        self.severity = self.max_severity = severity
+        self.steps = 1
+
+    def event(self, event, time):
+        return EpisodeEvent(event, time, self.vehicle1, self.vehicle2, self.start, self.ttc,
+                            self.min_ttc, self.distance, self.severity, self.max_severity, self.steps)
+
+class EpisodeTracker:
+    """
+    Collapse the per-step stream of detected pairs into alert episodes
+
+    A pair that keeps crossing the thresholds is reported by the detector on
+    every step. The tracker opens an episode the first time a pair is detected,
+    keeps its minimum TTC and maximum severity while it stays detected and
+    closes it once the pair has been clear for clear_steps consecutive steps,
+    so consumers see a handful of events per encounter instead of one record
+    per step.
+    """
+
+    def __init__(self, clear_steps=3):
+        """
+        Args:
+            clear_steps: Number of consecutive steps without a detection before an
+                         episode closes; more than one step keeps a TTC that hovers
+                         around the threshold from opening a new episode every step
+        """
+        if clear_steps < 1:
+            raise ValueError("clear_steps must be at least 1")
+
+        self.clear_steps = clear_steps
+        self.step = 0
+        self.active = {}  # (vehicle ID, vehicle ID) in sorted order -> _Episode
+        self.opened = 0
+        self.closed = 0
+        self.alert_rows = np.empty(0, dtype=np.int64)  # Pairs of the last update that opened or escalated
+
+    def update(self, time, result):
+        """
+        Feed the detections of one step
+
+        Args:
+            time: Simulation time of the step in seconds
+            result: CollisionResult of the step
+
+        Returns:
+            List of EpisodeEvent: OPEN for new episodes, ESCALATE when an open episode
+            reaches a higher severity, CLOSE for episodes that cleared. The indices of
+            the pairs behind OPEN and ESCALATE events are left in alert_rows.
+        """
+        self.step += 1
+        step = self.step
+        active = self.active
+        events = []
+        alert_rows = []
+
+        ids1, ids2 = result.vehicle_ids()
+        for row, (v1, v2, ttc, distance, severity) in enumerate(zip(
+                ids1, ids2, result.ttc.tolist(), result.distance.tolist(), result.severity.tolist())):
+            # Row order between two vehicles can change between steps, the key must not
+            key = (v1, v2) if v1 < v2 else (v2, v1)
+            episode = active.get(key)
+            if episode is None:
+                active[key] = episode = _Episode(v1, v2, time, step, ttc, distance, severity)
+                self.opened += 1
+                events.append(episode.event(OPEN, time))
+                alert_rows.append(row)
+                continue
+
+            episode.last_step = step
+            episode.steps += 1
+            episode.ttc = ttc
+            episode.distance = distance
+            episode.severity = severity
+            if ttc < episode.min_ttc:
+                episode.min_ttc = ttc
+            if severity > episode.max_severity:
+                episode.max_severity = severity
+                events.append(episode.event(ESCALATE, time))
+                alert_rows.append(row)
+
+        # Everything detected in this step is current, so only a backlog of clearing episodes is scanned
+        if len(active) > len(ids1):
+            expired = [key for key, episode in active.items() if step - episode.last_step >= self.clear_steps]
+            for key in expired:
+                events.append(active.pop(key).event(CLOSE, time))
+            self.closed += len(expired)
+
+        self.alert_rows = np.array(alert_rows, dtype=np.int64)
+        return events
+
+    def finish(self, time):
+        """
+        Close every open episode, e.g. at the end of the simulation
+
+        Returns:
+            List of CLOSE events
+        """
+        events = [episode.event(CLOSE, time) for episode in self.active.values()]
+        self.closed += len(events)
+        self.active.clear()
+        return events
@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from collision_detection import CollisionDetector
+from vanet_communication import VanetNetwork
+from synthetic_traffic import SyntheticTraffic, SCENARIOS
+
+def run_benchmark(scenario="highway", vehicle_count=100, steps=50, density=20.0, heading_noise=2.0,
+                  backend="vectorized", log_format="csv", max_hops=1,
+                  seed=0, track_memory=True, workers=None, shard_min_vehicles=None,
+                  ttc_model="point", alerts="raw"):
+    """
+    Drive CollisionDetector and VanetNetwork over a synthetic trajectory
+
+    Args:
+        scenario: Synthetic traffic scenario (see synthetic_traffic.SCENARIOS)
+        vehicle_count: Number of vehicles per step
+        steps: Number of simulation steps
+        density: Vehicles per kilometer of lane
+        heading_noise: Heading jitter in degrees
+        backend, log_format: CollisionDetector settings
+        max_hops: VanetNetwork relay hop limit
+        seed: Seed of the synthetic traffic
+        track_memory: Measure peak Python/NumPy memory with tracemalloc
+        workers: Worker processes of the sharded backend
+        shard_min_vehicles: Smallest step the sharded backend hands to its workers
+        ttc_model: CollisionDetector TTC model
+        alerts: "raw" or "episodes" alert delivery (see CollisionDetector)
+
+    Returns:
+        Dictionary with the configuration, timings, throughput and peak memory;
+        pairs_per_sec counts the candidate pairs the detector actually evaluated
+        (the grid's neighbours, or every pair for the scalar backend) per second of detection
+    """
+    traffic = SyntheticTraffic(scenario, vehicle_count, density=density, heading_noise=heading_noise, seed=seed)
+    trajectory = list(traffic.steps(steps))
+    settings = dict(backend=backend, log_format=log_format, max_hops=max_hops,
+                    workers=workers, shard_min_vehicles=shard_min_vehicles, ttc_model=ttc_model, alerts=alerts)
+
+    detect_time, warn_time, flush_time, detections, candidate_pairs = _drive(trajectory, **settings)
+
+    # tracemalloc slows allocation-heavy code a lot, so memory is measured in a separate pass
+    peak_memory = None
+    if track_memory:
+        tracemalloc.start()
+        _drive(trajectory, **settings)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    total_time = detect_time + warn_time + flush_time
+    vehicle_steps = vehicle_count * steps
+    return {
+        "scenario": scenario,
+        "vehicles": vehicle_count,
+        "steps": steps,
+        "density": density,
+        "backend": backend,
+        "workers": workers,
+        "shard_min_vehicles": shard_min_vehicles,
+        "ttc_model": ttc_model,
+        "alerts": alerts,
+        "log_format": log_format,
+        "max_hops": max_hops,
+        "detections": detections,
+        "candidate_pairs": candidate_pairs,
+        "detect_time": detect_time,
+        "warn_time": warn_time,
+        "flush_time": flush_time,
+        "total_time": total_time,
+        "vehicles_per_sec": vehicle_steps / total_time if total_time > 0 else float('inf'),
+        "pairs_per_sec": candidate_pairs / detect_time if detect_time > 0 else float('inf'),
+        "step_ms": 1000.0 * total_time / steps,
+        "peak_memory_mb": peak_memory / 2 ** 20 if peak_memory is not None else None,
+    }
+
+def _drive(trajectory, backend, log_format, max_hops, workers, shard_min_vehicles, ttc_model, alerts):
+    """Run detection and dissemination over a trajectory, logging to a temporary directory"""
+    with tempfile.TemporaryDirectory() as log_dir:
+        detector = CollisionDetector(backend=backend, log_format=log_format, log_dir=log_dir, workers=workers,
+                                     shard_min_vehicles=shard_min_vehicles, ttc_model=ttc_model, alerts=alerts)
+        vanet = VanetNetwork(log_format=log_format, max_hops=max_hops, log_dir=log_dir)
+
+        detect_time = 0.0
+        warn_time = 0.0
+        detections = 0
+        for arrays in trajectory:
+            start = time.perf_counter()
+            collision_pairs = detector.detect_collisions(arrays)
+            detected = time.perf_counter()
+            if detector.alerts:
+                vanet.send_warnings(arrays, detector.alerts)
+            warned = time.perf_counter()
+
+            detect_time += detected - start
+            warn_time += warned - detected
+            detections += len(collision_pairs)
+
+        # Include draining the log buffers so asynchronous writing is not hidden
+        start = time.perf_counter()
+        detector.close()
+        vanet.close()
+        flush_time = time.perf_counter() - start
+
+    return detect_time, warn_time, flush_time, detections, detector.candidate_pairs
+
+def compare_results(current, baseline, tolerance=0.10):
+    """
+    Compare two benchmark runs on matching configurations
+
+    Args:
+        current, baseline: Lists of result dictionaries from run_benchmark
+        tolerance: Relative slowdown of step time reported as a regression
+
+    Returns:
+        List of (configuration key, baseline step_ms, current step_ms, ratio, regressed)
+    """
+    def key(result):
+        return (result["scenario"], result["vehicles"], result["backend"],
+                result["log_format"], result["max_hops"], result.get("workers"), result.get("shard_min_vehicles"),
+                result.get("ttc_model", "point"), result.get("alerts", "raw"))
+
+    previous = {key(result): result for result in baseline}
+    comparison = []
+    for result in current:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        ratio = result["step_ms"] / old["step_ms"] if old["step_ms"] > 0 else float('inf')
+        comparison.append((key(result), old["step_ms"], result["step_ms"], ratio, ratio > 1 + tolerance))
+    return comparison
+
+def save_results(results, path):
+    """Save results together with basic machine information"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "machine": platform.platform(),
+            "python": platform.python_version(),
+            "results": results,
+        }, f, indent=2)
+
+def load_results(path):
+    """Load the result list of a saved benchmark run"""
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark collision detection on synthetic traffic (no SUMO required)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--counts", nargs="+", type=int, default=[10, 100, 1000, 10000],
+                        help="Vehicle counts to benchmark")
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--density", type=float, default=20.0, help="Vehicles per kilometer of lane")
+    parser.add_argument("--heading-noise", type=float, default=2.0, help="Heading jitter in degrees")
+    parser.add_argument("--backend", choices=["vectorized", "sharded", "scalar"], default="vectorized")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes of the sharded backend")
+    parser.add_argument("--shard-min-vehicles", type=int, default=None,
+                        help="Smallest step handed to the sharded workers (default: 20000)")
+    parser.add_argument("--ttc-model", choices=["point", "obb"], default="point")
+    parser.add_argument("--alerts", choices=["raw", "episodes"], default="raw")
+    parser.add_argument("--log-format", choices=["csv", "columnar"], default="csv")
+    parser.add_argument("--max-hops", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc peak memory tracking")
+    parser.add_argument("--output", default=None,
+                        help="Results file (default: data/benchmarks/benchmark-<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Previous results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Relative step time increase reported as a regression")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'scenario':<10}{'vehicles':>9}{'step ms':>10}{'veh/s':>12}{'cand pairs/s':>14}{'detections':>12}{'peak MB':>9}")
+    for scenario in args.scenarios:
+        for count in args.counts:
+            result = run_benchmark(scenario, count, steps=args.steps, density=args.density,
+                                   heading_noise=args.heading_noise, backend=args.backend,
+                                   log_format=args.log_format,
+                                   max_hops=args.max_hops, seed=args.seed, track_memory=not args.no_memory,
+                                   workers=args.workers, shard_min_vehicles=args.shard_min_vehicles,
+                                   ttc_model=args.ttc_model, alerts=args.alerts)
+            results.append(result)
+            peak = f"{result['peak_memory_mb']:.1f}" if result["peak_memory_mb"] is not None else "-"
+            print(f"{scenario:<10}{count:>9}{result['step_ms']:>10.2f}{result['vehicles_per_sec']:>12.0f}"
+                  f"{result['pairs_per_sec']:>14.3g}{result['detections']:>12}{peak:>9}")
+
+    output = args.output or os.path.join("data", "benchmarks", f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    save_results(results, output)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        regressions = 0
+        for key, old, new, ratio, regressed in compare_results(results, load_results(args.compare), args.tolerance):
+            regressions += regressed
+            flag = "REGRESSION" if regressed else ""
+            print(f"{key[0]:<10}{key[1]:>9}  {old:>9.2f} ms -> {new:>9.2f} ms  ({ratio:.2f}x) {flag}")
+        print(f"{regressions} regression(s) beyond {args.tolerance:.0%}")
@@ -2,9 +2,71 @@ import math
 import numpy as np
 import time
 import os
+from utils import format_sim_time
+from vehicle_arrays import VehicleArrays, as_vehicle_arrays
+from spatial_index import UniformGrid
+from log_writer import BufferedLogWriter
+from columnar_log import ColumnarLogWriter
+from swept_collision import swept_obb_ttc
+from alert_episodes import EpisodeTracker, ALERT_MODES, EPISODE_EVENTS
+from collision_result import CollisionResult, SEVERITY_LEVELS, severity_codes
+
+# Time-to-collision models: vehicles as points, or as oriented boxes swept over the horizon
+TTC_MODELS = ("point", "obb")
+
+def evaluate_pairs(arrays, idx1, idx2, distance_threshold, time_threshold, ttc_model="point"):
+    """
+    Compute distance, TTC and severity for candidate pairs in array operations
+    
+    Args:
+        arrays: VehicleArrays (or any object with the same columns)
+        idx1, idx2: Integer arrays of row indices forming the candidate pairs
+        distance_threshold: Maximum distance to consider for collision detection
+        time_threshold: Time-to-collision threshold in seconds
+        ttc_model: One of TTC_MODELS
+        
+    Returns:
+        Tuple (idx1, idx2, ttc, distance, relative_speed, severity_code) restricted
+        to the pairs whose TTC is within the threshold
+    """
+    # Relative position of vehicle 2 with respect to vehicle 1
+    dx = arrays.x[idx2] - arrays.x[idx1]
+    dy = arrays.y[idx2] - arrays.y[idx1]
+    distance = np.sqrt(dx * dx + dy * dy)
+    
+    # Skip pairs that are too far apart
+    near = distance <= distance_threshold
+    idx1, idx2, dx, dy, distance = idx1[near], idx2[near], dx[near], dy[near], distance[near]
+    
+    if ttc_model == "obb":
+        # Boxes that already touch report a TTC of 0
+        ttc = swept_obb_ttc(arrays, idx1, idx2, time_threshold)
+        hit = ttc < time_threshold
+    else:
+        # Relative velocity vector
+        rvx = arrays.vx[idx2] - arrays.vx[idx1]
+        rvy = arrays.vy[idx2] - arrays.vy[idx1]
+        rel_vel_sq = rvx * rvx + rvy * rvy
+        dot_product = dx * rvx + dy * rvy
+        
+        # Only pairs with non-negligible relative speed that are approaching have a finite TTC
+        approaching = (np.sqrt(rel_vel_sq) >= 0.1) & (dot_product < 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ttc = np.where(approaching, -dot_product / rel_vel_sq, np.inf)
+        
+        hit = (ttc > 0) & (ttc < time_threshold)
+    idx1, idx2, ttc, distance = idx1[hit], idx2[hit], ttc[hit], distance[hit]
+    
+    relative_speed = np.abs(arrays.speed[idx1] - arrays.speed[idx2])
+    severity = severity_codes(ttc, relative_speed)
+    
+    return idx1, idx2, ttc, distance, relative_speed, severity
 
 class CollisionDetector:
-    def __init__(self, time_threshold=3.0, distance_threshold=30.0, simulation_start_time=None):
+    def __init__(self, time_threshold=3.0, distance_threshold=30.0, simulation_start_time=None,
+                 backend="vectorized", log_format="csv",
+                 log_dir="data", workers=None, ttc_model="point",
+                 alerts="raw", clear_steps=3, shard_min_vehicles=None):
         """
         Initialize collision detector with thresholds
         
@@ -12,36 +74,131 @@ class CollisionDetector:
             time_threshold: Time-to-collision threshold in seconds
             distance_threshold: Maximum distance to consider for collision detection
             simulation_start_time: Reference time when simulation started
+            backend: "vectorized" to evaluate all pairs as NumPy array operations,
+                     "sharded" to split the vectorized evaluation over spatial tiles
+                     in worker processes, "scalar" for the original per-pair Python loop
+            log_format: "csv" for the text log, "columnar" for the binary record log
+            log_dir: Directory the log file is written to
+            workers: Number of worker processes of the sharded backend (defaults to the CPU count)
+            ttc_model: "point" for the center-point TTC, "obb" to sweep the vehicles' oriented
+                       length x width boxes (vectorized and sharded backends only)
+            alerts: "raw" to log every detected pair of every step, "episodes" to group
+                    consecutive detections of a pair into alert episodes and log only
+                    their open/escalate/close events (see episode_events)
+            clear_steps: Steps without a detection before an alert episode closes
+            shard_min_vehicles: Smallest step the sharded backend hands to its worker
+                                processes; smaller steps are evaluated in process
+                                (defaults to ShardedDetection's min_vehicles)
         """
+        if backend not in ("vectorized", "sharded", "scalar"):
+            raise ValueError(f"Unknown collision detection backend: {backend}")
+        if log_format not in ("csv", "columnar"):
+            raise ValueError(f"Unknown log format: {log_format}")
+        if ttc_model not in TTC_MODELS:
+            raise ValueError(f"Unknown TTC model: {ttc_model}")
+        if ttc_model == "obb" and backend == "scalar":
+            raise ValueError("The obb TTC model requires the vectorized or sharded backend")
+        if workers is not None and backend != "sharded":
+            raise ValueError("workers only applies to the sharded backend")
+        if shard_min_vehicles is not None and backend != "sharded":
+            raise ValueError("shard_min_vehicles only applies to the sharded backend")
+        if alerts not in ALERT_MODES:
+            raise ValueError(f"Unknown alert mode: {alerts}")
+        
         self.time_threshold = time_threshold
         self.distance_threshold = distance_threshold
+        self.ttc_model = ttc_model
         self.simulation_start_time = simulation_start_time or time.time()
         self.step_length = 0.1  # Default SUMO step length in seconds
         self.step = 0
-        self.log_file = "data/collision_log.txt"
+        self.severity_counts = np.zeros(len(SEVERITY_LEVELS), dtype=np.int64)  # Detections per severity
+        self.candidate_pairs = 0  # Vehicle pairs evaluated so far (grid candidates, or every pair when scalar)
+        self.backend = backend
+        self.sharded = None
+        if backend == "sharded":
+            # Imported here so the other backends never start worker processes
+            from sharded_detection import ShardedDetection
+            if shard_min_vehicles is None:
+                self.sharded = ShardedDetection(workers)
+            else:
+                self.sharded = ShardedDetection(workers, min_vehicles=shard_min_vehicles)
+        self.episodes = EpisodeTracker(clear_steps) if alerts == "episodes" else None
+        self.episode_events = []  # Episode events of the last step (episodes mode)
+        self.alerts = None  # CollisionResult of the pairs to warn about in the last step
+        self.profiler = None  # Optional StepProfiler; log writes are charged to its logging stage
+        self.log_format = log_format
+        log_name = "collision_log" if self.episodes is None else "collision_episodes"
+        self.log_file = os.path.join(log_dir, log_name + (".txt" if log_format == "csv" else ".bin"))
         
         # Create data directory if it doesn't exist
-        os.makedirs("data", exist_ok=True)
+        os.makedirs(log_dir, exist_ok=True)
         
-        # Initialize log file
-        with open(self.log_file, 'w') as f:
-            f.write("Timestamp,Vehicle1,Vehicle2,TTC,Distance,Severity\n")
+        # Initialize log file; text records are buffered and written by a background thread
+        if self.episodes is not None:
+            if log_format == "csv":
+                self.log_writer = BufferedLogWriter(self.log_file, "Timestamp,Event,Vehicle1,Vehicle2,Start,TTC,"
+                                                                   "MinTTC,Distance,Severity,MaxSeverity,Steps\n")
+            else:
+                self.log_writer = ColumnarLogWriter(self.log_file, "episode", {
+                    "event": EPISODE_EVENTS, "severity": SEVERITY_LEVELS, "max_severity": SEVERITY_LEVELS})
+        elif log_format == "csv":
+            self.log_writer = BufferedLogWriter(self.log_file, "Timestamp,Vehicle1,Vehicle2,TTC,Distance,Severity\n")
+        else:
+            self.log_writer = ColumnarLogWriter(self.log_file, "collision", {"severity": SEVERITY_LEVELS})
     
     def detect_collisions(self, vehicles_data):
         """
         Detect potential collisions between vehicles
         
         Args:
-            vehicles_data: Dictionary with vehicle IDs as keys and position/velocity as values
+            vehicles_data: Dictionary with vehicle IDs as keys and position/velocity as values,
+                           or a VehicleArrays snapshot
             
         Returns:
-            List of tuples (vehicle1_id, vehicle2_id, ttc) representing potential collisions
+            CollisionResult with the TTC, distance, relative speed and severity of every
+            potential collision; iterating it yields (vehicle1_id, vehicle2_id, ttc) tuples.
+            The pairs consumers should warn about are left in alerts and, in episodes
+            mode, the resulting episode events in episode_events.
         """
         self.step += 1
-        collision_pairs = []
+        arrays = as_vehicle_arrays(vehicles_data)
+        
+        if self.backend != "scalar":
+            result = self._detect_vectorized(arrays)
+        else:
+            result = self._detect_scalar(arrays, vehicles_data)
+        result.time = self.step * self.step_length
+        
+        self.severity_counts += np.bincount(result.severity, minlength=len(SEVERITY_LEVELS))
+        
+        if self.episodes is not None:
+            # Only new and escalated episodes are logged and warned about
+            self.episode_events = self.episodes.update(self.step * self.step_length, result)
+            self.alerts = result.subset(self.episodes.alert_rows)
+            self._lap("detect")
+            self._log_episode_events(self.episode_events)
+        else:
+            self.alerts = result
+            self._lap("detect")
+            self._log_result(result)
+        self._lap("logging")
+        return result
+    
+    def _lap(self, stage):
+        """Charge the time since the profiler's previous lap to stage, when profiling"""
+        if self.profiler is not None:
+            self.profiler.lap(stage)
+    
+    def _detect_scalar(self, arrays, vehicles_data):
+        """Compare every vehicle pair in a Python double loop (reference implementation)"""
+        if isinstance(vehicles_data, VehicleArrays):
+            vehicles_data = vehicles_data.to_vehicles_data()
+        
+        idx1, idx2, ttcs, distances, relative_speeds, severities = [], [], [], [], [], []
         vehicle_ids = list(vehicles_data.keys())
+        self.candidate_pairs += len(vehicle_ids) * (len(vehicle_ids) - 1) // 2
         
-        # Compare each pair of vehicles
+        # Compare each pair of vehicles; dictionary order is the row order of arrays
         for i in range(len(vehicle_ids)):
             for j in range(i+1, len(vehicle_ids)):
                 v1_id = vehicle_ids[i]
@@ -62,11 +219,56 @@ class CollisionDetector:
                 
                 # If TTC is within our threshold, report potential collision
                 if 0 < ttc < self.time_threshold:
-                    collision_pairs.append((v1_id, v2_id, ttc))
                     severity = self._calculate_severity(ttc, distance, v1['speed'], v2['speed'])
-                    self._log_collision(v1_id, v2_id, ttc, distance, severity)
+                    idx1.append(i)
+                    idx2.append(j)
+                    ttcs.append(ttc)
+                    distances.append(distance)
+                    relative_speeds.append(abs(v1['speed'] - v2['speed']))
+                    severities.append(SEVERITY_LEVELS.index(severity))
         
-        return collision_pairs
+        return CollisionResult(arrays, np.array(idx1, dtype=np.int64), np.array(idx2, dtype=np.int64),
+                               np.array(ttcs, dtype=np.float64), np.array(distances, dtype=np.float64),
+                               np.array(relative_speeds, dtype=np.float64), np.array(severities, dtype=np.int64))
+    
+    def _detect_vectorized(self, arrays):
+        """Evaluate every vehicle pair at once on the columnar vehicle arrays"""
+        # Only pairs inside the distance threshold are candidates; the grid returns them
+        # in row-major order, which keeps the same pair order as the scalar double loop
+        if self.sharded is not None:
+            result = CollisionResult(arrays, *self.sharded.evaluate(
+                arrays, self.distance_threshold, self.time_threshold, self.ttc_model))
+            self.candidate_pairs += self.sharded.candidates
+            return result
+        
+        grid = UniformGrid.from_arrays(arrays, self.distance_threshold)
+        idx1, idx2, _ = grid.pairs_within(self.distance_threshold)
+        self.candidate_pairs += len(idx1)
+        return CollisionResult(arrays, *evaluate_pairs(arrays, idx1, idx2, self.distance_threshold,
+                                                       self.time_threshold, self.ttc_model))
+    
+    def _log_result(self, result):
+        """Log all pairs of a step's result in one block"""
+        if not len(result):
+            return
+        elapsed_time = self.step * self.step_length
+        
+        if self.log_format == "columnar":
+            # Intern only the vehicles involved
+            ids = result.arrays.ids
+            involved = np.unique(np.concatenate((result.idx1, result.idx2)))
+            codes = np.zeros(len(ids), dtype=np.int32)
+            codes[involved] = [self.log_writer.intern(ids[i]) for i in involved.tolist()]
+            self.log_writer.extend(time=elapsed_time, vehicle1=codes[result.idx1], vehicle2=codes[result.idx2],
+                                   ttc=result.ttc, distance=result.distance, severity=result.severity)
+            return
+        
+        formatted_time = format_sim_time(elapsed_time)
+        ids1, ids2 = result.vehicle_ids()
+        self.log_writer.write(''.join(
+            f"{formatted_time},{v1_id},{v2_id},{t:.2f},{d:.2f},{SEVERITY_LEVELS[s]}\n"
+            for v1_id, v2_id, t, d, s in zip(ids1, ids2, result.ttc.tolist(), result.distance.tolist(),
+                                             result.severity.tolist())))
     
     def _calculate_distance(self, pos1, pos2):
         """Calculate Euclidean distance between two positions"""
@@ -139,11 +341,28 @@ class CollisionDetector:
         else:
             return "LOW"
     
-    def _log_collision(self, v1_id, v2_id, ttc, distance, severity):
-        """Log collision data to file with simulation time"""
-        # Calculate simulation time from step number
-        elapsed_time = self.step * self.step_length
-        formatted_time = f"{int(elapsed_time/60):02d}:{int(elapsed_time%60):02d}.{int((elapsed_time%1)*10):01d}"
+    def _log_episode_events(self, events):
+        """Log alert episode events to file with simulation time"""
+        if not events:
+            return
+        if self.log_format == "columnar":
+            intern = self.log_writer.intern
+            for e in events:
+                self.log_writer.append((e.time, e.event, intern(e.vehicle1), intern(e.vehicle2), e.start, e.ttc,
+                                        e.min_ttc, e.distance, e.severity, e.max_severity, e.steps))
+            return
         
-        with open(self.log_file, 'a') as f:
-            f.write(f"{formatted_time},{v1_id},{v2_id},{ttc:.2f},{distance:.2f},{severity}\n")
\ No newline at end of file
+        self.log_writer.write(''.join(
+            f"{format_sim_time(e.time)},{EPISODE_EVENTS[e.event]},{e.vehicle1},{e.vehicle2},"
+            f"{format_sim_time(e.start)},{e.ttc:.2f},{e.min_ttc:.2f},{e.distance:.2f},"
+            f"{SEVERITY_LEVELS[e.severity]},{SEVERITY_LEVELS[e.max_severity]},{e.steps}\n"
+            for e in events))
+    
+    def close(self):
+        """Close open alert episodes, flush buffered log records, close the log file and stop sharded workers"""
+        if self.episodes is not None:
+            self.episode_events = self.episodes.finish(self.step * self.step_length)
+            self._log_episode_events(self.episode_events)
+        self.log_writer.close()
+        if self.sharded is not None:
+            self.sharded.close()
\ No newline at end of file
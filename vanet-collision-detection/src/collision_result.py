@@ -0,0 +1,83 @@
+import numpy as np
+
+# Severity labels indexed by their integer severity code
+SEVERITY_LEVELS = ("LOW", "MEDIUM", "HIGH", "CRITICAL")
+
+def severity_codes(ttc, relative_speed):
+    """Vectorized severity rule returning indices into SEVERITY_LEVELS"""
+    return np.where(ttc < 1.0,
+                    np.where(relative_speed > 10.0, 3, 2),
+                    np.where(ttc < 2.0, 1, 0))
+
+class CollisionResult:
+    """
+    Pairs detected in one step, as aligned NumPy arrays
+
+    Distance, relative speed and severity are computed once by the detector;
+    the logs, the VANET model, the console and the GUI all read them from here.
+    Row indices refer to the VehicleArrays snapshot the pairs were found in.
+    Iterating yields (vehicle1_id, vehicle2_id, ttc) tuples, the layout
+    detect_collisions used to return.
+    """
+
+    def __init__(self, arrays, idx1, idx2, ttc, distance, relative_speed, severity, time=None):
+        """
+        Args:
+            arrays: VehicleArrays snapshot of the step
+            idx1, idx2: Row indices of the two vehicles of every pair
+            ttc: Time to collision of every pair in seconds
+            distance: Distance between the vehicles of every pair in meters
+            relative_speed: Absolute speed difference of every pair in m/s
+            severity: Severity code of every pair (index into SEVERITY_LEVELS)
+            time: Simulation time of the step in seconds, when known
+        """
+        self.arrays = arrays
+        self.idx1 = idx1
+        self.idx2 = idx2
+        self.ttc = ttc
+        self.distance = distance
+        self.relative_speed = relative_speed
+        self.severity = severity
+        self.time = time
+        self._vehicle_ids = None
+
+    @classmethod
+    def from_pairs(cls, arrays, collision_pairs):
+        """
+        Build a result from a list of (v1, v2, ttc) tuples
+
+        Args:
+            arrays: VehicleArrays snapshot containing the vehicles
+            collision_pairs: List of tuples (v1, v2, ttc)
+
+        Returns:
+            CollisionResult with distance, relative speed and severity computed for every pair
+        """
+        row_of = arrays.row_of
+        idx1 = np.array([row_of[v1_id] for v1_id, _, _ in collision_pairs], dtype=np.int64)
+        idx2 = np.array([row_of[v2_id] for _, v2_id, _ in collision_pairs], dtype=np.int64)
+        ttc = np.array([ttc for _, _, ttc in collision_pairs], dtype=np.float64)
+        dx = arrays.x[idx2] - arrays.x[idx1]
+        dy = arrays.y[idx2] - arrays.y[idx1]
+        distance = np.sqrt(dx * dx + dy * dy)
+        relative_speed = np.abs(arrays.speed[idx1] - arrays.speed[idx2])
+        return cls(arrays, idx1, idx2, ttc, distance, relative_speed, severity_codes(ttc, relative_speed))
+
+    def subset(self, rows):
+        """Result restricted to the given pair indices (or boolean mask)"""
+        return CollisionResult(self.arrays, self.idx1[rows], self.idx2[rows], self.ttc[rows], self.distance[rows],
+                               self.relative_speed[rows], self.severity[rows], self.time)
+
+    def vehicle_ids(self):
+        """Lists of the first and second vehicle ID of every pair (built once and cached)"""
+        if self._vehicle_ids is None:
+            ids = self.arrays.ids
+            self._vehicle_ids = ([ids[i] for i in self.idx1.tolist()], [ids[i] for i in self.idx2.tolist()])
+        return self._vehicle_ids
+
+    def __len__(self):
+        return len(self.ttc)
+
+    def __iter__(self):
+        ids1, ids2 = self.vehicle_ids()
+        return zip(ids1, ids2, self.ttc.tolist())
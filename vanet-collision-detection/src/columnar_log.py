@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import numpy as np
+from log_writer import register_writer, unregister_writer
+from utils import format_sim_time
+
+# Record layouts of the two logs. Times are simulation seconds, vehicle IDs are
+# indices into the interned ID table and labels are indices into the label tables.
+LOG_SCHEMAS = {
+    "collision": {
+        "dtype": [('time', '<f8'), ('vehicle1', '<i4'), ('vehicle2', '<i4'),
+                  ('ttc', '<f8'), ('distance', '<f8'), ('severity', 'u1')],
+        "header": "Timestamp,Vehicle1,Vehicle2,TTC,Distance,Severity\n",
+    },
+    "communication": {
+        "dtype": [('time', '<f8'), ('sender', '<i4'), ('receiver', '<i4'),
+                  ('message_type', 'u1'), ('severity', 'u1'), ('distance', '<f8'), ('success', '?')],
+        "header": "Timestamp,Sender,Receiver,MessageType,Severity,Distance,Success\n",
+    },
+    "episode": {
+        "dtype": [('time', '<f8'), ('event', 'u1'), ('vehicle1', '<i4'), ('vehicle2', '<i4'),
+                  ('start', '<f8'), ('ttc', '<f8'), ('min_ttc', '<f8'), ('distance', '<f8'),
+                  ('severity', 'u1'), ('max_severity', 'u1'), ('steps', '<u4')],
+        "header": "Timestamp,Event,Vehicle1,Vehicle2,Start,TTC,MinTTC,Distance,Severity,MaxSeverity,Steps\n",
+    },
+}
+
+def meta_path(path):
+    """Path of the JSON sidecar describing a binary log"""
+    return os.path.splitext(path)[0] + ".meta.json"
+
+class ColumnarLogWriter:
+    """
+    Binary log of fixed-size records that can be memory-mapped without parsing
+
+    Records are collected in NumPy chunks and appended to ``path`` as raw bytes.
+    A JSON sidecar stores the record layout, the interned vehicle ID table and
+    the label tables needed to turn codes back into text. The sidecar is written
+    when the log is created and refreshed on every flush, and writers that are
+    still open when the interpreter exits are closed like BufferedLogWriter.
+    """
+
+    def __init__(self, path, kind, labels, chunk_size=65536):
+        """
+        Create (truncate) the binary log
+
+        Args:
+            path: Path of the binary record file
+            kind: Schema name in LOG_SCHEMAS ("collision", "communication" or "episode")
+            labels: Dictionary mapping coded fields to their label tuples,
+                    e.g. {"severity": SEVERITY_LEVELS}
+            chunk_size: Number of records buffered before they are written
+        """
+        if kind not in LOG_SCHEMAS:
+            raise ValueError(f"Unknown log kind: {kind}")
+
+        self.path = path
+        self.kind = kind
+        self.labels = {name: list(values) for name, values in labels.items()}
+        self.dtype = np.dtype(LOG_SCHEMAS[kind]["dtype"])
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.ids = []
+        self._id_index = {}
+        self._rows = []
+        self._closed = False
+
+        self._file = open(path, 'wb')
+        self._write_meta()
+        register_writer(self)
+
+    def intern(self, vehicle_id):
+        """Return the integer code of a vehicle ID, adding it to the table if new"""
+        code = self._id_index.get(vehicle_id)
+        if code is None:
+            code = len(self.ids)
+            self._id_index[vehicle_id] = code
+            self.ids.append(vehicle_id)
+        return code
+
+    def append(self, record):
+        """Buffer one record given as a tuple in schema field order"""
+        self._rows.append(record)
+        if len(self._rows) >= self.chunk_size:
+            self._write_rows()
+
+    def extend(self, **columns):
+        """
+        Append many records at once from column arrays
+
+        Args:
+            columns: One array (or scalar) per schema field, all broadcastable
+                     to the same length
+        """
+        self._write_rows()
+        length = max(np.size(value) for value in columns.values())
+        records = np.empty(length, dtype=self.dtype)
+        for name in self.dtype.names:
+            records[name] = columns[name]
+        records.tofile(self._file)
+        self.count += length
+
+    def flush(self):
+        """Write buffered records and refresh the sidecar"""
+        self._write_rows()
+        self._file.flush()
+        self._write_meta()
+
+    def close(self):
+        """Flush everything and close the record file"""
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+            self._closed = True
+            unregister_writer(self)
+
+    def _write_rows(self):
+        if not self._rows:
+            return
+        records = np.array(self._rows, dtype=self.dtype)
+        records.tofile(self._file)
+        self.count += len(records)
+        self._rows = []
+
+    def _write_meta(self):
+        meta = {
+            "kind": self.kind,
+            "dtype": LOG_SCHEMAS[self.kind]["dtype"],
+            "count": self.count,
+            "ids": self.ids,
+            "labels": self.labels,
+        }
+        with open(meta_path(self.path), 'w') as f:
+            json.dump(meta, f)
+
+
+class ColumnarLog:
+    """A binary log loaded as a read-only memory map"""
+
+    def __init__(self, path):
+        """
+        Map a binary log written by ColumnarLogWriter
+
+        Args:
+            path: Path of the binary record file
+        """
+        with open(meta_path(path)) as f:
+            meta = json.load(f)
+
+        self.path = path
+        self.kind = meta["kind"]
+        self.dtype = np.dtype([tuple(field) for field in meta["dtype"]])
+        self.ids = np.array(meta["ids"], dtype=object)
+        self.labels = meta["labels"]
+        if meta["count"]:
+            self.records = np.memmap(path, dtype=self.dtype, mode='r', shape=(meta["count"],))
+        else:
+            self.records = np.empty(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    def to_dataframe(self):
+        """Return the records as a pandas DataFrame with vehicle IDs and labels decoded"""
+        import pandas as pd
+
+        frame = pd.DataFrame({name: self.records[name] for name in self.dtype.names})
+        for name in self.dtype.names:
+            if name in self.labels:
+                frame[name] = pd.Categorical.from_codes(frame[name], self.labels[name])
+            elif self.records.dtype[name] == np.dtype('<i4'):
+                frame[name] = self.ids[self.records[name]]
+        return frame
+
+    def export_csv(self, csv_path, chunk_size=65536):
+        """
+        Write the log in the CSV layout produced by the text logger
+
+        Args:
+            csv_path: Destination of the CSV file
+            chunk_size: Number of records formatted per batch
+        """
+        format_row = {"collision": self._collision_row, "communication": self._communication_row,
+                      "episode": self._episode_row}[self.kind]
+        with open(csv_path, 'w') as f:
+            f.write(LOG_SCHEMAS[self.kind]["header"])
+            for start in range(0, len(self.records), chunk_size):
+                chunk = self.records[start:start + chunk_size]
+                columns = [chunk[name].tolist() for name in self.dtype.names]
+                f.write(''.join(format_row(*row) for row in zip(*columns)))
+
+    def _collision_row(self, time, vehicle1, vehicle2, ttc, distance, severity):
+        ids = self.ids
+        return (f"{format_sim_time(time)},{ids[vehicle1]},{ids[vehicle2]},{ttc:.2f},{distance:.2f},"
+                f"{self.labels['severity'][severity]}\n")
+
+    def _communication_row(self, time, sender, receiver, message_type, severity, distance, success):
+        ids = self.ids
+        return (f"{format_sim_time(time)},{ids[sender]},{ids[receiver]},"
+                f"{self.labels['message_type'][message_type]},{self.labels['severity'][severity]},"
+                f"{distance:.2f},{success}\n")
+
+    def _episode_row(self, time, event, vehicle1, vehicle2, start, ttc, min_ttc, distance, severity,
+                     max_severity, steps):
+        ids = self.ids
+        severities = self.labels['severity']
+        return (f"{format_sim_time(time)},{self.labels['event'][event]},{ids[vehicle1]},{ids[vehicle2]},"
+                f"{format_sim_time(start)},{ttc:.2f},{min_ttc:.2f},{distance:.2f},{severities[severity]},"
+                f"{severities[max_severity]},{steps}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a binary collision/communication/episode log to CSV")
+    parser.add_argument("binary_log", help="Path of the binary log (e.g. data/collision_log.bin)")
+    parser.add_argument("csv_log", help="Destination CSV path")
+    args = parser.parse_args()
+
+    ColumnarLog(args.binary_log).export_csv(args.csv_log)
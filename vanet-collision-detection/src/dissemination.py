@@ -0,0 +1,207 @@
+from collections import namedtuple
+import numpy as np
+from spatial_index import UniformGrid
+
+# Message type codes, indices into vanet_communication.MESSAGE_TYPES
+COLLISION_WARNING = 0
+NEARBY_COLLISION = 1
+
+# Per-delivery outcome of a multi-hop flood; hops and latency describe the receiver
+FloodResult = namedtuple("FloodResult", ["event", "sender", "receiver", "hops", "latency", "distance", "success"])
+
+class NeighborTable:
+    """
+    In-range neighbour lists of every vehicle for one step, stored as CSR arrays
+
+    The neighbours of row ``i`` are ``neighbors[indptr[i]:indptr[i + 1]]`` in
+    ascending row order, with the matching distances in ``distances``.
+    """
+
+    def __init__(self, arrays, transmission_range):
+        """
+        Build the table from a spatial index query
+
+        Args:
+            arrays: VehicleArrays for the current step
+            transmission_range: Maximum communication range in meters
+        """
+        n = len(arrays)
+        self.size = n
+        self.transmission_range = transmission_range
+
+        grid = UniformGrid.from_arrays(arrays, transmission_range)
+        idx1, idx2, distance = grid.pairs_within(transmission_range)
+
+        # Store every link in both directions, grouped by source and sorted by target
+        source = np.concatenate((idx1, idx2))
+        target = np.concatenate((idx2, idx1))
+        distance = np.concatenate((distance, distance))
+        order = np.lexsort((target, source))
+
+        self.neighbors = target[order]
+        self.distances = distance[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=n), out=self.indptr[1:])
+
+    def degree(self, rows):
+        """Number of in-range neighbours of each row"""
+        return self.indptr[rows + 1] - self.indptr[rows]
+
+    def expand(self, rows):
+        """
+        List the neighbours of many rows at once
+
+        Args:
+            rows: Array of query rows
+
+        Returns:
+            Tuple (query, neighbor, distance) where query indexes into rows
+        """
+        counts = self.degree(rows)
+        total = int(counts.sum())
+        query = np.repeat(np.arange(len(rows)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        links = self.indptr[rows][query] + offsets
+        return query, self.neighbors[links], self.distances[links]
+
+
+def direct_deliveries(table, arrays, pair_rows1, pair_rows2, pair_distance=None):
+    """
+    Warnings exchanged between the two vehicles of each collision pair
+
+    Args:
+        pair_distance: Distance between the vehicles of each pair, when already known
+
+    Returns:
+        Tuple (pair, sender, receiver, distance) of arrays, v1 -> v2 before v2 -> v1
+        for every pair whose vehicles are within transmission range
+    """
+    if pair_distance is None:
+        dx = arrays.x[pair_rows1] - arrays.x[pair_rows2]
+        dy = arrays.y[pair_rows1] - arrays.y[pair_rows2]
+        pair_distance = np.sqrt(dx ** 2 + dy ** 2)
+    in_range = pair_distance <= table.transmission_range
+
+    pair = np.repeat(np.arange(len(pair_rows1))[in_range], 2)
+    sender = np.column_stack((pair_rows1[in_range], pair_rows2[in_range])).ravel()
+    receiver = np.column_stack((pair_rows2[in_range], pair_rows1[in_range])).ravel()
+    distance = np.repeat(pair_distance[in_range], 2)
+    return pair, sender, receiver, distance
+
+
+def single_hop_deliveries(table, arrays, pair_rows1, pair_rows2, pair_distance=None):
+    """
+    Generate all warning deliveries for a step's collision pairs in bulk
+
+    For each pair (v1, v2) the two vehicles warn each other when in range, and
+    each of them warns every other vehicle within its own range. Deliveries are
+    returned in the order a per-vehicle scan would produce them: pair by pair,
+    direct warnings first, then receivers in row order with v1's message before
+    v2's.
+
+    Args:
+        table: NeighborTable for the current step
+        arrays: VehicleArrays for the current step
+        pair_rows1, pair_rows2: Row indices of the vehicles in each collision pair
+        pair_distance: Distance between the vehicles of each pair, when already known
+
+    Returns:
+        Tuple (pair, sender, receiver, message_type, distance) of arrays, where
+        pair indexes the collision pair that triggered each delivery
+    """
+    pair_count = len(pair_rows1)
+    direct_pair, direct_sender, direct_receiver, direct_distance = direct_deliveries(
+        table, arrays, pair_rows1, pair_rows2, pair_distance)
+    direct_slot = np.tile([0, 1], len(direct_pair) // 2)
+
+    # Nearby warnings from each pair vehicle to its other neighbours
+    senders = np.concatenate((pair_rows1, pair_rows2))
+    partners = np.concatenate((pair_rows2, pair_rows1))
+    query, receiver, distance = table.expand(senders)
+    keep = receiver != partners[query]
+    query, receiver, distance = query[keep], receiver[keep], distance[keep]
+    nearby_pair = query % pair_count if pair_count else query
+    nearby_from_second = query >= pair_count
+
+    # Order key inside a pair: direct warnings, then by receiver row, v1's copy before v2's
+    pair = np.concatenate((direct_pair, nearby_pair))
+    slot = np.concatenate((direct_slot, 2 + receiver * 2 + nearby_from_second))
+    order = np.lexsort((slot, pair))
+
+    sender = np.concatenate((direct_sender, senders[query]))[order]
+    receiver = np.concatenate((direct_receiver, receiver))[order]
+    distance = np.concatenate((direct_distance, distance))[order]
+    message_type = np.concatenate((np.full(len(direct_pair), COLLISION_WARNING, dtype=np.uint8),
+                                   np.full(len(query), NEARBY_COLLISION, dtype=np.uint8)))[order]
+    return pair[order], sender, receiver, message_type, distance
+
+
+def flood_deliveries(table, pair_rows1, pair_rows2, max_hops, draw, loss_rate, hop_latency):
+    """
+    Propagate warnings over several relay hops with duplicate suppression
+
+    Every collision pair is one event whose two vehicles hold the warning at hop
+    0. At each hop, the vehicles that received the warning in the previous hop
+    relay it once to their in-range neighbours that do not hold it yet. When
+    several relays reach the same vehicle in the same hop only the copy from
+    the closest relay is transmitted. A lost packet leaves the receiver
+    uninformed, so it can still be reached by another relay at a later hop.
+
+    All events advance together: the frontier is a flat list of (event, vehicle)
+    states expanded through the CSR neighbour table, so one breadth-first
+    traversal per hop covers every collision source. Work is bounded by the
+    number of (event, vehicle) states reached within max_hops.
+
+    Args:
+        table: NeighborTable for the current step
+        pair_rows1, pair_rows2: Row indices of the vehicles in each collision pair
+        max_hops: Maximum number of relay hops (TTL)
+        draw: Callable returning an array of count uniform [0, 1) values
+        loss_rate: Probability of packet loss per delivery
+        hop_latency: Latency added by every hop in seconds
+
+    Returns:
+        FloodResult of arrays, one entry per attempted delivery in hop order
+    """
+    n = max(table.size, 1)
+    events = np.arange(len(pair_rows1))
+
+    frontier_event = np.concatenate((events, events))
+    frontier_row = np.concatenate((pair_rows1, pair_rows2))
+    informed = np.unique(frontier_event * n + frontier_row)
+
+    parts = []
+    for hop in range(1, max_hops + 1):
+        if len(frontier_row) == 0:
+            break
+
+        query, receiver, distance = table.expand(frontier_row)
+        event = frontier_event[query]
+        sender = frontier_row[query]
+        key = event * n + receiver
+
+        # Duplicate suppression against everything already informed
+        pos = np.minimum(np.searchsorted(informed, key), len(informed) - 1)
+        fresh = informed[pos] != key
+        key, event, sender, receiver, distance = key[fresh], event[fresh], sender[fresh], receiver[fresh], distance[fresh]
+
+        # One copy per (event, receiver): the closest relay wins, ties go to the lowest row
+        order = np.lexsort((sender, distance, key))
+        key, event, sender, receiver, distance = key[order], event[order], sender[order], receiver[order], distance[order]
+        first = np.ones(len(key), dtype=bool)
+        first[1:] = key[1:] != key[:-1]
+        key, event, sender, receiver, distance = key[first], event[first], sender[first], receiver[first], distance[first]
+
+        success = draw(len(key)) > loss_rate
+        parts.append((event, sender, receiver, np.full(len(key), hop), distance, success))
+
+        informed = np.union1d(informed, key[success])
+        frontier_event = event[success]
+        frontier_row = receiver[success]
+
+    if not parts:
+        empty = np.empty(0, dtype=np.int64)
+        return FloodResult(empty, empty, empty, empty, np.empty(0), np.empty(0), np.empty(0, dtype=bool))
+
+    event, sender, receiver, hops, distance, success = (np.concatenate(column) for column in zip(*parts))
+    return FloodResult(event, sender, receiver, hops, hops * hop_latency, distance, success)
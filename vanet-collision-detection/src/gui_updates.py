@@ -0,0 +1,136 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+
+# SUMO vehicle colors (RGBA) used to highlight collision risks
+DEFAULT_COLOR = (255, 255, 255, 255)  # White/default
+WARNING_COLOR = (255, 204, 0, 255)  # Yellow: potential collision
+IMMINENT_COLOR = (255, 0, 0, 255)  # Bright red: imminent collision
+
+class AlertRingBuffer:
+    """
+    Bounded, coalescing hand-off of display rows from the simulation to the GUI thread
+
+    Every row has a key (a vehicle pair or an alert episode). A row whose key is
+    already waiting replaces the waiting row, so a pair reported on every step
+    costs the GUI one update per tick instead of one per step. When more than
+    capacity distinct keys are waiting, the oldest rows are dropped and counted
+    rather than letting the buffer grow without bound.
+    """
+
+    def __init__(self, capacity=500):
+        """
+        Args:
+            capacity: Maximum number of rows waiting for the GUI
+        """
+        self.capacity = capacity
+        self.dropped = 0
+        self.closed = False
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key, values):
+        """
+        Queue a row for display, replacing a waiting row with the same key
+
+        Args:
+            key: Hashable row identity
+            values: Tuple of column values
+        """
+        with self._lock:
+            rows = self._rows
+            if key in rows:
+                rows.move_to_end(key)
+            rows[key] = values
+            if len(rows) > self.capacity:
+                rows.popitem(last=False)
+                self.dropped += 1
+
+    def drain(self, limit=None):
+        """
+        Take waiting rows, oldest first
+
+        Args:
+            limit: Maximum number of rows to take (all when None)
+
+        Returns:
+            List of (key, values) tuples
+        """
+        with self._lock:
+            rows = self._rows
+            if limit is None or limit >= len(rows):
+                batch = list(rows.items())
+                rows.clear()
+            else:
+                batch = [rows.popitem(last=False) for _ in range(limit)]
+        return batch
+
+    def close(self):
+        """Mark the end of the simulation; rows still waiting are drained as usual"""
+        self.closed = True
+
+    def __len__(self):
+        return len(self._rows)
+
+def pair_colors(result, imminent_ttc=1.5):
+    """
+    Highlight color of every vehicle involved in a collision pair
+
+    A vehicle in several pairs gets the color of its most urgent one.
+
+    Args:
+        result: CollisionResult of the step
+        imminent_ttc: TTC below which a pair is shown as imminent (red) instead of potential (yellow)
+
+    Returns:
+        Dictionary mapping vehicle IDs to colors
+    """
+    # Highlight level per vehicle row: 0 none, 1 potential, 2 imminent
+    level = np.zeros(len(result.arrays), dtype=np.int8)
+    pair_level = np.where(result.ttc < imminent_ttc, 2, 1).astype(np.int8)
+    np.maximum.at(level, result.idx1, pair_level)
+    np.maximum.at(level, result.idx2, pair_level)
+
+    ids = result.arrays.ids
+    highlighted = np.flatnonzero(level)
+    return {ids[row]: IMMINENT_COLOR if urgent else WARNING_COLOR
+            for row, urgent in zip(highlighted.tolist(), (level[highlighted] == 2).tolist())}
+
+class VehicleColorer:
+    """
+    Diff-based vehicle coloring for the SUMO GUI
+
+    Remembers the color last sent for every vehicle, so only vehicles whose
+    highlight changed cost a setColor call instead of resetting every vehicle
+    on every step.
+    """
+
+    def __init__(self, default_color=DEFAULT_COLOR):
+        self.default_color = default_color
+        self.sent = {}  # Vehicle ID -> color last sent to SUMO
+
+    def changes(self, vehicle_ids, highlights):
+        """
+        Colors that have to be sent for this step
+
+        Args:
+            vehicle_ids: IDs of the vehicles currently in the simulation
+            highlights: Dictionary mapping highlighted vehicle IDs to their color (see pair_colors)
+
+        Returns:
+            List of (vehicle_id, color) for vehicles that are new or whose color changed
+        """
+        sent = self.sent
+        default = self.default_color
+        updates = []
+        for vehicle_id in vehicle_ids:
+            color = highlights.get(vehicle_id, default)
+            if sent.get(vehicle_id) != color:
+                sent[vehicle_id] = color
+                updates.append((vehicle_id, color))
+
+        # Forget vehicles that left the simulation
+        if len(sent) > len(vehicle_ids):
+            for vehicle_id in sent.keys() - set(vehicle_ids):
+                del sent[vehicle_id]
+        return updates
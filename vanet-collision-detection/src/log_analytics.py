@@ -0,0 +1,554 @@
+import argparse
+import heapq
+import itertools
+import json
+import os
+import numpy as np
+from alert_episodes import EPISODE_EVENTS, CLOSE, OPEN
+from collision_result import SEVERITY_LEVELS
+from columnar_log import ColumnarLog
+from utils import parse_sim_time
+from vanet_communication import MESSAGE_TYPES
+
+COLLISION_WARNING = MESSAGE_TYPES.index("COLLISION_WARNING")
+
+def step_quantiles(counts, step_length, quantiles):
+    """
+    Quantiles of a histogram of whole step counts, in seconds
+
+    Returns:
+        List of quantile values (None when the histogram is empty)
+    """
+    total = counts.sum()
+    if total == 0:
+        return [None] * len(quantiles)
+    steps = np.searchsorted(np.cumsum(counts), np.asarray(quantiles) * total, side='left')
+    return (steps * step_length).round(3).tolist()
+
+def histogram_quantiles(counts, edges, quantiles):
+    """
+    Approximate quantiles of a fixed-bin histogram, interpolating inside the bins
+
+    Args:
+        counts: Counts of the len(edges) - 1 bins
+        edges: Bin edges
+        quantiles: Quantiles in [0, 1]
+
+    Returns:
+        List of quantile values (None when the histogram is empty)
+    """
+    total = counts.sum()
+    if total == 0:
+        return [None] * len(quantiles)
+    cumulative = np.concatenate(([0], np.cumsum(counts)))
+    return np.interp(np.asarray(quantiles) * total, cumulative, edges).round(3).tolist()
+
+class HeavyHitters:
+    """
+    Misra-Gries summary of the most frequent items in bounded memory
+
+    At most capacity counters are kept. Updates are merged in batches; when a
+    batch pushes the summary over capacity, the (capacity + 1)-th largest count
+    is subtracted from every counter and the counters that drop to zero are
+    removed. Reported counts are therefore lower bounds, at most ``error`` below
+    the true count, and error never exceeds total / (capacity + 1).
+    """
+
+    def __init__(self, capacity=1000):
+        """
+        Args:
+            capacity: Maximum number of counters kept
+        """
+        self.capacity = capacity
+        self.counts = {}
+        self.total = 0
+        self.error = 0
+
+    def update(self, items, counts):
+        """Add counts for a batch of distinct items"""
+        merged = self.counts
+        for item, count in zip(items, counts):
+            merged[item] = merged.get(item, 0) + count
+            self.total += count
+
+        if len(merged) > self.capacity:
+            values = np.fromiter(merged.values(), dtype=np.int64, count=len(merged))
+            cut = int(np.partition(values, len(values) - self.capacity - 1)[len(values) - self.capacity - 1])
+            self.error += cut
+            self.counts = {item: count - cut for item, count in merged.items() if count > cut}
+
+    def top(self, n):
+        """The n items with the largest counts as (item, count) tuples"""
+        # Ties are broken by item so the ranking does not depend on the batch sizes
+        return heapq.nsmallest(n, self.counts.items(), key=lambda item: (-item[1], item[0]))
+
+class LogAnalytics:
+    """
+    Rolling statistics over the collision and communication streams in constant memory
+
+    Detections and deliveries are fed in chunks, either read from the logs or
+    straight from a running simulation, and only aggregates are kept:
+
+    - messages sent and delivered per severity and message type
+    - TTC histograms per severity, from which the quantiles are derived
+    - alerts per vehicle in a bounded HeavyHitters summary
+    - the latency from an alert to the first successful COLLISION_WARNING
+      between the two vehicles, as a histogram counted in steps
+
+    An alert is the first detection of a pair, or the first one after the pair
+    has not been detected for more than alert_gap seconds (the OPEN events of an
+    episode log). It is answered by the first delivered warning between the two
+    vehicles at or after its time. Alerts stay pending until they are answered
+    or are older than max_latency, so the state grows with the number of
+    concurrently alerted pairs, not with the length of the logs.
+
+    Chunks must arrive in time order, and the detections of a step before the
+    deliveries of that step; advance(time) is called once everything up to time
+    has been fed.
+    """
+
+    def __init__(self, step_length=0.1, ttc_max=10.0, ttc_bin=0.1, alert_gap=0.35, max_latency=10.0,
+                 top_vehicles=20, vehicle_capacity=1000):
+        """
+        Args:
+            step_length: Simulation step length in seconds; latencies are counted in steps
+            ttc_max: Upper edge of the TTC histograms; larger TTCs go to the last bin
+            ttc_bin: Width of a TTC histogram bin in seconds
+            alert_gap: Seconds without a detection after which the next detection of a pair
+                       is a new alert; the default matches episodes with clear_steps=3
+            max_latency: Seconds after which an alert without a warning counts as unwarned
+            top_vehicles: Number of vehicles reported in the alert rate ranking
+            vehicle_capacity: Number of vehicle counters kept by the alert summary
+        """
+        self.step_length = step_length
+        self.alert_gap = alert_gap
+        self.max_latency = max_latency
+        self.top_vehicles = top_vehicles
+
+        levels = len(SEVERITY_LEVELS)
+        self.sent = np.zeros((levels, len(MESSAGE_TYPES)), dtype=np.int64)
+        self.delivered = np.zeros((levels, len(MESSAGE_TYPES)), dtype=np.int64)
+        self.ttc_edges = np.linspace(0.0, ttc_max, int(round(ttc_max / ttc_bin)) + 1)
+        self.ttc_counts = np.zeros((levels, len(self.ttc_edges) - 1), dtype=np.int64)
+        self.latency_steps = np.zeros(int(round(max_latency / step_length)) + 1, dtype=np.int64)
+        self.vehicle_alerts = HeavyHitters(vehicle_capacity)
+
+        self.detections = 0
+        self.alerts = 0
+        self.unwarned = 0
+        self.first_time = None
+        self.last_time = None
+        self.active = {}  # (vehicle ID, vehicle ID) in sorted order -> time of the last detection
+        self.pending = {}  # (vehicle ID, vehicle ID) in sorted order -> times of the alerts awaiting a warning
+        self.peak_state = 0  # Largest number of tracked pairs left after advance()
+
+    def add_detections(self, time, vehicle1, vehicle2, ttc, severity, is_alert=None):
+        """
+        Feed a chunk of detections
+
+        Args:
+            time: Simulation time of every detection (array, or a scalar for one step)
+            vehicle1, vehicle2: Sequences of the vehicle IDs of every detection
+            ttc: Array of TTCs in seconds
+            severity: Array of severity codes (indices into SEVERITY_LEVELS)
+            is_alert: Boolean array marking the detections that start an alert; derived
+                      from alert_gap when None
+        """
+        if len(ttc) == 0:
+            return
+        times = np.broadcast_to(np.asarray(time, dtype=np.float64), np.shape(ttc))
+        self._observe_time(times)
+        self.detections += len(ttc)
+
+        bins = np.clip(np.searchsorted(self.ttc_edges, ttc, side='right') - 1, 0, self.ttc_counts.shape[1] - 1)
+        np.add.at(self.ttc_counts, (severity, bins), 1)
+
+        active = self.active
+        pending = self.pending
+        gap = self.alert_gap
+        flags = itertools.repeat(None) if is_alert is None else np.asarray(is_alert).tolist()
+        alerted = []
+        for t, v1, v2, flag in zip(times.tolist(), vehicle1, vehicle2, flags):
+            key = (v1, v2) if v1 < v2 else (v2, v1)
+            if flag is None:
+                last = active.get(key)
+                active[key] = t
+                flag = last is None or t - last > gap
+            if flag:
+                alerted.append(v1)
+                alerted.append(v2)
+                # A chunk may hold several alerts of a pair before the deliveries that answer them
+                waiting = pending.get(key)
+                if waiting is None:
+                    pending[key] = [t]
+                else:
+                    waiting.append(t)
+
+        if alerted:
+            self.alerts += len(alerted) // 2
+            vehicles, counts = np.unique(np.array(alerted, dtype=object), return_counts=True)
+            self.vehicle_alerts.update(vehicles.tolist(), counts.tolist())
+
+    def add_messages(self, time, sender, receiver, message_type, severity, success):
+        """
+        Feed a chunk of deliveries
+
+        Args:
+            time: Simulation time of every delivery (array, or a scalar for one step)
+            sender, receiver: Sequences of the vehicle IDs of every delivery
+            message_type: Array of message type codes (indices into MESSAGE_TYPES)
+            severity: Array of severity codes
+            success: Boolean array, True for delivered messages
+        """
+        if len(success) == 0:
+            return
+        success = np.asarray(success, dtype=bool)
+        np.add.at(self.sent, (severity, message_type), 1)
+        np.add.at(self.delivered, (severity[success], message_type[success]), 1)
+
+        pending = self.pending
+        if not pending:
+            return
+        # Only a delivered direct warning between the two vehicles answers an alert
+        rows = np.flatnonzero(success & (message_type == COLLISION_WARNING))
+        times = np.broadcast_to(np.asarray(time, dtype=np.float64), success.shape)[rows]
+        max_latency = self.max_latency
+        latencies = []
+        for t, s, r in zip(times.tolist(), (sender[i] for i in rows.tolist()), (receiver[i] for i in rows.tolist())):
+            key = (s, r) if s < r else (r, s)
+            waiting = pending.get(key)
+            if waiting is None or waiting[0] > t:
+                continue
+            # Alert times are in order: every alert up to t is answered by this warning
+            answered = 1
+            while answered < len(waiting) and waiting[answered] <= t:
+                answered += 1
+            for alert_time in waiting[:answered]:
+                # advance() may not have run since the alert expired
+                if t - alert_time > max_latency:
+                    self.unwarned += 1
+                else:
+                    latencies.append(t - alert_time)
+            if answered < len(waiting):
+                pending[key] = waiting[answered:]
+            else:
+                del pending[key]
+        if latencies:
+            steps = np.rint(np.array(latencies) / self.step_length).astype(np.int64)
+            np.add.at(self.latency_steps, np.minimum(steps, len(self.latency_steps) - 1), 1)
+
+    def advance(self, time):
+        """Forget pairs that cleared and expire unanswered alerts, everything up to time has been fed"""
+        active = self.active
+        horizon = time - self.alert_gap
+        for key in [key for key, last in active.items() if last < horizon]:
+            del active[key]
+
+        pending = self.pending
+        horizon = time - self.max_latency
+        for key in [key for key, waiting in pending.items() if waiting[0] < horizon]:
+            waiting = pending[key]
+            expired = 1
+            while expired < len(waiting) and waiting[expired] < horizon:
+                expired += 1
+            self.unwarned += expired
+            if expired < len(waiting):
+                pending[key] = waiting[expired:]
+            else:
+                del pending[key]
+
+        # Sampled here only: every step when fed live, once per merge round when reading logs
+        self.peak_state = max(self.peak_state, len(active) + len(pending))
+
+    def observe_result(self, result):
+        """Feed the detections of one simulation step (a CollisionResult with time set)"""
+        ids1, ids2 = result.vehicle_ids()
+        self.add_detections(result.time, ids1, ids2, result.ttc, result.severity)
+
+    def observe_deliveries(self, elapsed_time, ids, sender, receiver, message_type, severity, success):
+        """Delivery listener for VanetNetwork: feed a batch of deliveries of one step"""
+        self.add_messages(elapsed_time, [ids[i] for i in sender.tolist()], [ids[i] for i in receiver.tolist()],
+                          message_type, severity, success)
+
+    def _observe_time(self, times):
+        if self.first_time is None:
+            self.first_time = float(times.min())
+        self.last_time = float(times.max())
+
+    def summary(self):
+        """
+        Aggregates as a JSON-serializable dictionary
+
+        Alerts still pending at the end are reported separately from the expired
+        unwarned ones, as the logs may simply end before their warning.
+
+        peak_tracked_pairs is a memory diagnostic, not a statistic of the logs:
+        it is sampled whenever advance() runs, so when reading logs it depends
+        on the chunk size. All other figures do not.
+        """
+        duration = (self.last_time - self.first_time + self.step_length) if self.first_time is not None else 0.0
+        minutes = duration / 60.0
+
+        delivery = {}
+        for code, level in enumerate(SEVERITY_LEVELS):
+            sent = int(self.sent[code].sum())
+            delivered = int(self.delivered[code].sum())
+            delivery[level] = {
+                "sent": sent,
+                "delivered": delivered,
+                "ratio": round(delivered / sent, 4) if sent else None,
+                "by_type": {name: {"sent": int(self.sent[code, t]), "delivered": int(self.delivered[code, t])}
+                            for t, name in enumerate(MESSAGE_TYPES)},
+            }
+
+        quantiles = (0.5, 0.9, 0.99)
+        ttc = {}
+        for code, level in enumerate(SEVERITY_LEVELS):
+            counts = self.ttc_counts[code]
+            ttc[level] = {"count": int(counts.sum()),
+                          "quantiles": dict(zip(("p50", "p90", "p99"), histogram_quantiles(counts, self.ttc_edges, quantiles)))}
+        combined = self.ttc_counts.sum(axis=0)
+
+        warned = int(self.latency_steps.sum())
+        vehicles = self.vehicle_alerts
+
+        return {
+            "time_span": {"start": self.first_time, "end": self.last_time, "duration": round(duration, 3)},
+            "detections": self.detections,
+            "alerts": self.alerts,
+            "delivery_ratio": delivery,
+            "ttc": {
+                "bin_width": float(self.ttc_edges[1] - self.ttc_edges[0]),
+                "max": float(self.ttc_edges[-1]),
+                "histogram": combined.tolist(),
+                "quantiles": dict(zip(("p50", "p90", "p99"), histogram_quantiles(combined, self.ttc_edges, quantiles))),
+                "by_severity": ttc,
+            },
+            "alert_latency": {
+                "warned": warned,
+                "unwarned": self.unwarned,
+                "pending": sum(len(waiting) for waiting in self.pending.values()),
+                "step_length": self.step_length,
+                "histogram_steps": np.trim_zeros(self.latency_steps, 'b').tolist(),
+                "quantiles": dict(zip(("p50", "p90", "p99"),
+                                      step_quantiles(self.latency_steps, self.step_length, quantiles))),
+            },
+            "vehicle_alerts": {
+                "tracked": len(vehicles.counts),
+                "max_undercount": vehicles.error,
+                "top": [{"vehicle": vehicle, "alerts": count,
+                         "per_minute": round(count / minutes, 3) if minutes else None}
+                        for vehicle, count in vehicles.top(self.top_vehicles)],
+            },
+            "peak_tracked_pairs": self.peak_state,
+        }
+
+    def write(self, path):
+        """Write the summary as JSON"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+def _csv_chunks(path, chunk_size):
+    """Yield (kind, columns) chunks of a CSV log, columns as a list of per-field lists"""
+    with open(path) as f:
+        header = f.readline().rstrip("\n").split(",")
+        if len(header) < 2:
+            return
+        kind = {"Vehicle1": "collision", "Event": "episode", "Sender": "communication"}.get(header[1])
+        if kind is None:
+            raise ValueError(f"Unrecognized log header in {path}: {','.join(header)}")
+        width = len(header)
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                return
+            # The loggers never quote fields, so one split of the whole chunk replaces per-row parsing
+            fields = ",".join(lines).replace("\n", "").split(",")
+            if len(fields) != width * len(lines):
+                raise ValueError(f"Malformed row in {path}")
+            yield kind, [fields[i::width] for i in range(width)]
+
+def _parse_times(column):
+    # Timestamps repeat for every row of a step, parse each distinct one once
+    parsed = {text: parse_sim_time(text) for text in set(column)}
+    return np.array([parsed[text] for text in column], dtype=np.float64)
+
+def _label_codes(column, labels):
+    index = {label: code for code, label in enumerate(labels)}
+    return np.array([index[label] for label in column], dtype=np.int64)
+
+def _read_csv(path, chunk_size):
+    for kind, columns in _csv_chunks(path, chunk_size):
+        times = _parse_times(columns[0])
+        if kind == "collision":
+            yield kind, {"time": times, "vehicle1": columns[1], "vehicle2": columns[2],
+                         "ttc": np.array(columns[3], dtype=np.float64),
+                         "severity": _label_codes(columns[5], SEVERITY_LEVELS), "is_alert": None}
+        elif kind == "episode":
+            event = _label_codes(columns[1], EPISODE_EVENTS)
+            yield kind, {"time": times, "vehicle1": columns[2], "vehicle2": columns[3],
+                         "ttc": np.array(columns[5], dtype=np.float64),
+                         "severity": _label_codes(columns[8], SEVERITY_LEVELS), "event": event}
+        else:
+            yield kind, {"time": times, "sender": columns[1], "receiver": columns[2],
+                         "message_type": _label_codes(columns[3], MESSAGE_TYPES),
+                         "severity": _label_codes(columns[4], SEVERITY_LEVELS),
+                         "success": np.array(columns[6]) == "True"}
+
+def _read_columnar(path, chunk_size):
+    log = ColumnarLog(path)
+    ids = log.ids
+    # Map the stored label tables onto the current code order
+    remap = {name: np.array([table.index(label) for label in log.labels[name]], dtype=np.int64)
+             for name, table in (("severity", SEVERITY_LEVELS), ("message_type", MESSAGE_TYPES),
+                                 ("event", EPISODE_EVENTS)) if name in log.labels}
+    for start in range(0, len(log.records), chunk_size):
+        chunk = log.records[start:start + chunk_size]
+        times = np.array(chunk['time'])
+        if log.kind == "communication":
+            yield log.kind, {"time": times, "sender": ids[chunk['sender']].tolist(),
+                             "receiver": ids[chunk['receiver']].tolist(),
+                             "message_type": remap["message_type"][chunk['message_type']],
+                             "severity": remap["severity"][chunk['severity']], "success": np.array(chunk['success'])}
+        else:
+            columns = {"time": times, "vehicle1": ids[chunk['vehicle1']].tolist(),
+                       "vehicle2": ids[chunk['vehicle2']].tolist(), "ttc": np.array(chunk['ttc']),
+                       "severity": remap["severity"][chunk['severity']], "is_alert": None}
+            if log.kind == "episode":
+                columns["event"] = remap["event"][chunk['event']]
+            yield log.kind, columns
+
+def read_log_chunks(path, chunk_size=10000):
+    """
+    Read a collision, episode or communication log (CSV or binary) in chunks
+
+    Episode logs are turned into detection chunks: OPEN and ESCALATE events are
+    the detections, OPEN events the alerts; CLOSE events carry no new detection.
+
+    Yields:
+        Tuples (kind, columns) with kind "collision" or "communication" and the
+        columns as arrays/lists keyed by the add_detections/add_messages argument names
+    """
+    chunks = _read_csv(path, chunk_size) if not path.endswith(".bin") else _read_columnar(path, chunk_size)
+    for kind, columns in chunks:
+        if kind == "episode":
+            event = columns.pop("event")
+            keep = np.flatnonzero(event != CLOSE)
+            columns = {"time": columns["time"][keep], "vehicle1": [columns["vehicle1"][i] for i in keep.tolist()],
+                       "vehicle2": [columns["vehicle2"][i] for i in keep.tolist()], "ttc": columns["ttc"][keep],
+                       "severity": columns["severity"][keep], "is_alert": event[keep] == OPEN}
+            kind = "collision"
+            if not len(keep):
+                continue
+        yield kind, columns
+
+def _split(columns, end):
+    """Split a time-sorted chunk into the rows before end and the rest"""
+    n = int(np.searchsorted(columns["time"], end, side='left'))
+    head, tail = {}, {}
+    for name, values in columns.items():
+        if values is None:
+            head[name] = tail[name] = None
+        else:
+            head[name], tail[name] = values[:n], values[n:]
+    return head, tail
+
+def _concat(parts):
+    """Join the chunks buffered for one stream into a single set of columns"""
+    if len(parts) == 1:
+        return parts[0]
+    joined = {}
+    for name, values in parts[0].items():
+        if values is None:
+            joined[name] = None
+        elif isinstance(values, np.ndarray):
+            joined[name] = np.concatenate([part[name] for part in parts])
+        else:
+            joined[name] = list(itertools.chain.from_iterable(part[name] for part in parts))
+    return joined
+
+def analyze_logs(collision_path, communication_path, analytics=None, chunk_size=10000):
+    """
+    Stream a collision (or episode) log and a communication log through LogAnalytics
+
+    Both logs are read chunk by chunk and merged by time. Each round feeds the
+    detections and then the deliveries before the earlier of the two chunk ends;
+    the rows of the last, possibly incomplete step of a chunk wait for the next
+    chunk, so about one chunk per log is in memory.
+
+    Args:
+        collision_path: Collision or episode log, CSV or .bin
+        communication_path: Communication log, CSV or .bin
+        analytics: LogAnalytics to feed (a default one when None)
+        chunk_size: Rows read per chunk
+
+    Returns:
+        The LogAnalytics instance
+    """
+    if analytics is None:
+        analytics = LogAnalytics()
+    streams = {"collision": read_log_chunks(collision_path, chunk_size),
+               "communication": read_log_chunks(communication_path, chunk_size)}
+    feed = {"collision": analytics.add_detections, "communication": analytics.add_messages}
+    buffered = {"collision": None, "communication": None}
+
+    while True:
+        # Read on while a stream has nothing or only one step buffered. The chunks are
+        # joined once, so a step spanning many chunks is not copied again for every chunk
+        for name, columns in buffered.items():
+            parts = [] if columns is None else [columns]
+            while name in streams and (not parts or parts[0]["time"][0] == parts[-1]["time"][-1]):
+                chunk = next(streams[name], None)
+                if chunk is None:
+                    del streams[name]
+                    break
+                kind, more = chunk
+                if kind != name:
+                    raise ValueError(f"Expected a {name} log, got a {kind} log")
+                parts.append(more)
+            buffered[name] = _concat(parts) if parts else None
+
+        live = [name for name, columns in buffered.items() if columns is not None]
+        if not live:
+            break
+        # Streams still being read bound how far the round can go
+        reading = [name for name in live if name in streams]
+        end = min(buffered[name]["time"][-1] for name in reading) if reading else np.inf
+
+        for name in live:
+            head, tail = _split(buffered[name], end)
+            if len(head["time"]):
+                feed[name](**head)
+            buffered[name] = tail if len(tail["time"]) else None
+        if reading:
+            analytics.advance(end)
+    return analytics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize collision and communication logs in bounded memory")
+    parser.add_argument("collision_log", help="Collision or episode log (CSV or .bin)")
+    parser.add_argument("communication_log", help="Communication log (CSV or .bin)")
+    parser.add_argument("--output", default="data/log_summary.json")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows read per chunk")
+    parser.add_argument("--step-length", type=float, default=0.1)
+    parser.add_argument("--alert-gap", type=float, default=0.35,
+                        help="Seconds without a detection before a pair's next detection is a new alert")
+    parser.add_argument("--max-latency", type=float, default=10.0,
+                        help="Seconds after which an alert without a warning counts as unwarned")
+    parser.add_argument("--top", type=int, default=20, help="Vehicles listed in the alert ranking")
+    args = parser.parse_args()
+
+    analytics = LogAnalytics(step_length=args.step_length, alert_gap=args.alert_gap,
+                             max_latency=args.max_latency, top_vehicles=args.top)
+    analyze_logs(args.collision_log, args.communication_log, analytics, chunk_size=args.chunk_size)
+    analytics.write(args.output)
+
+    summary = analytics.summary()
+    latency = summary["alert_latency"]
+    print(f"{summary['detections']} detections, {summary['alerts']} alerts; "
+          f"{latency['warned']} warned (median {latency['quantiles']['p50']}s), {latency['unwarned']} unwarned. "
+          f"Summary written to {args.output}")
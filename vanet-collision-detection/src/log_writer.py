@@ -0,0 +1,158 @@
+import atexit
+import threading
+import weakref
+from collections import deque
+
+# Writers that still hold buffered records, flushed when the interpreter exits
+_open_writers = weakref.WeakSet()
+
+def register_writer(writer):
+    """Close writer (any object with an idempotent close()) when the interpreter exits"""
+    _open_writers.add(writer)
+
+def unregister_writer(writer):
+    """Forget a writer that has been closed"""
+    _open_writers.discard(writer)
+
+class BufferedLogWriter:
+    """
+    Append-only text log with an in-memory buffer and a background writer thread
+
+    ``write`` only appends the text to a list. Full buffers are handed to the
+    writer thread, which also flushes whatever is buffered every
+    ``flush_interval`` seconds. The file stays open for the lifetime of the
+    writer instead of being reopened for every record, and the bytes written are
+    the same as appending each line separately. If a write to the file fails,
+    the writer thread stops and the error is raised by the next ``write``,
+    ``flush`` or ``close``.
+    """
+
+    def __init__(self, path, header=None, buffer_size=1000, flush_interval=1.0, max_pending=16):
+        """
+        Create (truncate) the log file and start the writer thread
+
+        Args:
+            path: Path of the log file
+            header: Optional first line written immediately, including its newline
+            buffer_size: Number of buffered lines (newlines) that triggers a hand-off to the writer
+            flush_interval: Maximum time in seconds a line stays in the buffer
+            max_pending: Maximum number of full buffers waiting for the writer;
+                         producers block once it is reached
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+
+        self._file = open(path, 'w')
+        if header:
+            self._file.write(header)
+            self._file.flush()
+
+        self._lines = []
+        self._line_count = 0  # Newlines in self._lines
+        self._chunks = deque()
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        self._writing = False
+        self._error = None  # Exception that stopped the writer thread
+        self._closing = False
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name=f"log-writer:{path}", daemon=True)
+        self._thread.start()
+        register_writer(self)
+
+    def write(self, text):
+        """Buffer one or more lines, each including its trailing newline"""
+        with self._cond:
+            self._raise_error()
+            self._lines.append(text)
+            self._line_count += text.count('\n')
+            if self._line_count < self.buffer_size:
+                return
+            # Back-pressure: wait for the writer when too many full buffers are queued
+            while len(self._chunks) >= self.max_pending and self._error is None:
+                self._cond.wait()
+            self._raise_error()
+            self._chunks.append(self._lines)
+            self._lines = []
+            self._line_count = 0
+            self._cond.notify_all()
+
+    def flush(self):
+        """Hand the current buffer to the writer thread and wait until it is on disk"""
+        with self._cond:
+            if self._closed:
+                return
+            if self._lines:
+                self._chunks.append(self._lines)
+                self._lines = []
+                self._line_count = 0
+                self._cond.notify_all()
+            while (self._chunks or self._writing) and self._error is None:
+                self._cond.wait()
+            self._raise_error()
+
+    def close(self):
+        """Flush everything, stop the writer thread and close the file"""
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            with self._cond:
+                self._closing = True
+                self._cond.notify_all()
+            self._thread.join()
+            self._closed = True
+            self._file.close()
+            unregister_writer(self)
+
+    def _raise_error(self):
+        """Re-raise the exception that stopped the writer thread (call with the lock held)"""
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._chunks and not self._closing:
+                    self._cond.wait(self.flush_interval)
+                # Full buffers are always older than the partial one, so take them first
+                if self._chunks:
+                    lines = self._chunks.popleft()
+                elif self._lines:
+                    lines, self._lines = self._lines, []
+                    self._line_count = 0
+                elif self._closing:
+                    return
+                else:
+                    continue
+                self._writing = True
+                self._cond.notify_all()
+
+            try:
+                self._file.write(''.join(lines))
+                self._file.flush()
+            except BaseException as error:
+                with self._cond:
+                    self._error = error
+                return
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def close_all_writers():
+    """Flush and close every writer that is still open"""
+    for writer in list(_open_writers):
+        writer.close()
+
+atexit.register(close_all_writers)
@@ -1,16 +1,24 @@
+import time
+
+# Reference point of the startup measurement, taken before any other import
+STARTUP_BEGIN = time.perf_counter()
+
 import os
 import sys
-import traci
 import argparse
-import math
-import threading
-import queue
-import time
-import tkinter as tk
-from tkinter import ttk
-from collision_detection import CollisionDetector
+from collision_detection import CollisionDetector, SEVERITY_LEVELS
+from alert_episodes import EPISODE_EVENTS, CLOSE
+from gui_updates import AlertRingBuffer, VehicleColorer, pair_colors
 from vanet_communication import VanetNetwork
-from utils import calculate_distance
+from profiling import StepProfiler
+from step_pipeline import SerialSteps, PipelinedSteps
+from utils import format_sim_time
+
+# TraCI, Tk, the trace recorder, log analytics and cProfile/pstats (--profile) are imported
+# where they are used, so headless batch runs only load what they need. StepProfiler times
+# every run and is imported above.
+
+IMPORT_TIME = time.perf_counter() - STARTUP_BEGIN
 
 # Set SUMO_HOME environment variable if not set
 if 'SUMO_HOME' not in os.environ:
@@ -23,10 +31,25 @@ if 'SUMO_HOME' in os.environ:
 else:
     sys.exit("Please declare environment variable 'SUMO_HOME'")
 
-def create_demo_window():
-    """Create a demonstration window showing collision information"""
-    # Queue for thread-safe communication
-    collision_queue = queue.Queue()
+def create_demo_window(capacity=500, max_rows=100, batch_size=200, interval_ms=100):
+    """
+    Create a demonstration window showing collision information
+    
+    Args:
+        capacity: Rows waiting for the window before the oldest ones are dropped
+        max_rows: Rows kept in the table; the least recently updated ones are removed
+        batch_size: Maximum number of rows applied to the table per refresh
+        interval_ms: Refresh interval of the window in milliseconds
+    
+    Returns:
+        AlertRingBuffer the simulation puts (key, values) rows into
+    """
+    import threading
+    import tkinter as tk
+    from tkinter import ttk
+    
+    # Bounded buffer for thread-safe communication; repeated keys are coalesced
+    alert_buffer = AlertRingBuffer(capacity)
     
     # Create window in a separate thread to not block simulation
     def run_window():
@@ -60,31 +83,47 @@ def create_demo_window():
         status = ttk.Label(frame, textvariable=status_var)
         status.pack(pady=5)
         
-        # Function to check queue and update UI
-        def check_queue():
-            try:
-                while True:  # Process all available items
-                    item = collision_queue.get_nowait()
-                    if item == "END":
-                        status_var.set("Simulation completed")
-                        return
-                    
-                    # Add new collision to tree
-                    sim_time, v1, v2, ttc, severity = item
-                    tree.insert("", 0, values=(sim_time, v1, v2, f"{ttc:.2f}s", severity))
-                    status_var.set(f"Latest collision risk: {v1} and {v2} in {ttc:.2f}s")
-                    
-                    # Keep only the last 100 entries to avoid slowdown
-                    if len(tree.get_children()) > 100:
-                        tree.delete(tree.get_children()[-1])
-            except queue.Empty:
-                pass
-            finally:
-                # Schedule next check
-                root.after(100, check_queue)
-        
-        # Start queue checking
-        check_queue()
+        # Table row of every key on display, and the key of every row
+        row_of_key = {}
+        key_of_row = {}
+        
+        # Apply one batch of buffered rows to the table per tick
+        def refresh():
+            batch = alert_buffer.drain(batch_size)
+            for key, values in batch:
+                row = row_of_key.get(key)
+                if row is None:
+                    row = tree.insert("", 0, values=values)
+                    row_of_key[key] = row
+                    key_of_row[row] = key
+                else:
+                    # Updated rows move to the top, so trimming drops the stalest ones
+                    tree.item(row, values=values)
+                    tree.move(row, "", 0)
+            
+            if batch:
+                # Keep only the last max_rows entries to avoid slowdown
+                children = tree.get_children()
+                if len(children) > max_rows:
+                    stale = children[max_rows:]
+                    tree.delete(*stale)
+                    for row in stale:
+                        del row_of_key[key_of_row.pop(row)]
+                
+                _, v1, v2, ttc, severity = batch[-1][1]
+                message = f"Latest collision risk: {v1} and {v2}, TTC {ttc} ({severity})"
+                if alert_buffer.dropped:
+                    message += f" - {alert_buffer.dropped} alerts dropped"
+                status_var.set(message)
+            
+            if alert_buffer.closed and not len(alert_buffer):
+                status_var.set("Simulation completed")
+                return
+            # Schedule next refresh
+            root.after(interval_ms, refresh)
+        
+        # Start refreshing
+        refresh()
         
         root.mainloop()
     
@@ -93,26 +132,56 @@ def create_demo_window():
     thread.daemon = True
     thread.start()
     
-    return collision_queue
+    return alert_buffer
 
-def run_simulation(use_gui=False):
+def episode_row(event):
+    """Demo window row (key, values) of an alert episode event; one row per episode"""
+    severity = SEVERITY_LEVELS[event.max_severity]
+    if event.event == CLOSE:
+        severity += " (cleared)"
+    values = (format_sim_time(event.start), event.vehicle1, event.vehicle2, f"{event.min_ttc:.2f}s", severity)
+    return (event.vehicle1, event.vehicle2, event.start), values
+
+def run_simulation(use_gui=False, backend="vectorized", log_format="csv",
+                   max_hops=1, profile=False, timings_path=None,
+                   record_path=None, workers=None, shard_min_vehicles=None, ttc_model="point", alerts="raw",
+                   pipeline=False, pipeline_depth=2, steps=1000, window=True, startup_budget_ms=None,
+                   analytics_path=None):
+    import traci
+    from traci_collector import SubscriptionCollector
+    
     # Track simulation time
     simulation_start_time = time.time()
     step_length = 0.1  # Default SUMO step length in seconds (check your config)
     
     # Initialize collision detector with simulation start time
     detector = CollisionDetector(time_threshold=3.0, distance_threshold=30.0, 
-                               simulation_start_time=simulation_start_time)
-    vanet = VanetNetwork(transmission_range=100.0)
+                               simulation_start_time=simulation_start_time,
+                               backend=backend, log_format=log_format, workers=workers,
+                               shard_min_vehicles=shard_min_vehicles, ttc_model=ttc_model,
+                               alerts=alerts)
+    vanet = VanetNetwork(transmission_range=100.0, log_format=log_format, max_hops=max_hops)
     
-    # Create the demo window and get the queue for sending collision data
-    collision_queue = create_demo_window()
+    # Create the demo window and get the buffer for sending collision data (None when headless)
+    alert_buffer = create_demo_window() if window else None
     
-    # Start SUMO
+    # Start SUMO; its launch time is reported separately from our own startup
     sumo_binary = "sumo-gui" if use_gui else "sumo"
     sumo_cmd = [os.path.join(os.environ['SUMO_HOME'], 'bin', sumo_binary), 
                 "-c", "simulation/sumo_config.sumocfg"]
+    sumo_launch = time.perf_counter()
     traci.start(sumo_cmd)
+    sumo_launch = time.perf_counter() - sumo_launch
+    collector = SubscriptionCollector()
+    recorder = None
+    if record_path:
+        from trace_recorder import TraceRecorder
+        recorder = TraceRecorder(record_path, step_length=step_length)
+    analytics = None
+    if analytics_path:
+        from log_analytics import LogAnalytics
+        analytics = LogAnalytics(step_length=step_length)
+        vanet.delivery_listener = analytics.observe_deliveries
     
     # Show vehicle IDs in the GUI (Approach 1) - CORRECTED
     if use_gui:
@@ -123,100 +192,205 @@ def run_simulation(use_gui=False):
             traci.gui.setShowVehicleNames("View #0", True)  # Show vehicle IDs above vehicles
         except Exception as e:
             print(f"Warning: Could not configure GUI completely: {e}")
+    # Only vehicles whose highlight changed are recolored (Approach 2)
+    colorer = VehicleColorer()
     
     step = 0
     collision_count = 0
     
+    # Per-stage step timings, and optionally a full cProfile of the loop
+    profiler = StepProfiler(step_length=step_length)
+    detector.profiler = vanet.profiler = profiler
+    code_profile = None
+    if profile:
+        import cProfile
+        code_profile = cProfile.Profile()
+        code_profile.enable()
+    
+    # SUMO stepping and data collection run in this thread, or ahead of the loop in a second one
+    if pipeline:
+        sumo_steps = PipelinedSteps(collector, steps, profiler, depth=pipeline_depth)
+    else:
+        sumo_steps = SerialSteps(collector, steps, profiler)
+    
+    # Startup: interpreter imports and setup up to the first step, excluding the SUMO launch
+    profiler.startup_time = time.perf_counter() - STARTUP_BEGIN - sumo_launch
+    print(f"Startup: {profiler.startup_time * 1000:.0f} ms (imports {IMPORT_TIME * 1000:.0f} ms), "
+          f"SUMO launch: {sumo_launch * 1000:.0f} ms")
+    if startup_budget_ms is not None and profiler.startup_time * 1000 > startup_budget_ms:
+        print(f"Warning: startup exceeded the budget of {startup_budget_ms:.0f} ms")
+    
     print("Starting VANET collision detection simulation")
     print("=============================================")
     
     # Main simulation loop
-    while step < 1000:  # Run for 1000 steps or until all vehicles finish
-        traci.simulationStep()
+    while True:  # Run for the given number of steps
+        profiler.begin_step()
+        fetched = sumo_steps.next_step()
+        if fetched is None:
+            break
         
-        # Get all vehicles in the simulation
-        vehicle_ids = traci.vehicle.getIDList()
+        # All vehicles in the simulation, collected through subscriptions into columnar arrays
+        vehicle_ids, vehicles_data = fetched
         if not vehicle_ids:
-            print("No vehicles in simulation, skipping step")
-            step += 1
-            continue
+            # The step still runs on the empty snapshot, so the detector's clock advances
+            # and open alert episodes keep counting clear steps and close on time
+            print("No vehicles in simulation")
+        
+        if recorder:
+            recorder.record(step, vehicles_data)
+        profiler.lap("collect")
         
-        # Reset all vehicle colors to default (Approach 2)
+        # Detect potential collisions; distance, TTC and severity are computed once, in the detector
+        collision_pairs = detector.detect_collisions(vehicles_data)
+        if analytics:
+            analytics.observe_result(collision_pairs)
+        profiler.lap("detect")
+        
+        # Highlight colliding vehicles in red (imminent) or yellow (potential), others in white
         if use_gui:
-            for vehicle_id in vehicle_ids:
-                traci.vehicle.setColor(vehicle_id, (255, 255, 255, 255))  # White/default
-        
-        # Collect vehicle data
-        vehicles_data = {}
-        for vehicle_id in vehicle_ids:
-            position = traci.vehicle.getPosition(vehicle_id)
-            speed = traci.vehicle.getSpeed(vehicle_id)
-            angle = traci.vehicle.getAngle(vehicle_id)
-            length = traci.vehicle.getLength(vehicle_id)
-            width = traci.vehicle.getWidth(vehicle_id)
+            sumo_steps.set_colors(colorer.changes(vehicle_ids, pair_colors(collision_pairs)))
             
-            vehicles_data[vehicle_id] = {
-                'position': position,
-                'speed': speed,
-                'angle': angle,
-                'length': length,
-                'width': width
-            }
-        
-        # Detect potential collisions
-        collision_pairs = detector.detect_collisions(vehicles_data)
+            # Log to console
+            if collision_pairs:
+                print(''.join(f"Collision risk: {v1} and {v2} in {ttc:.1f}s\n" for v1, v2, ttc in collision_pairs),
+                      end='')
+        profiler.lap("gui")
         
-        # Highlight colliding vehicles (Approach 2)
-        if use_gui and collision_pairs:
-            for v1, v2, ttc in collision_pairs:
-                # Highlight colliding vehicles in red (more severe) or yellow (less severe)
-                if ttc < 1.5:  # Imminent collision
-                    traci.vehicle.setColor(v1, (255, 0, 0, 255))  # Bright red
-                    traci.vehicle.setColor(v2, (255, 0, 0, 255))  # Bright red
-                else:  # Potential collision
-                    traci.vehicle.setColor(v1, (255, 204, 0, 255))  # Yellow
-                    traci.vehicle.setColor(v2, (255, 204, 0, 255))  # Yellow
+        # In episodes mode, warnings, the demo window and the console only see episode changes
+        if detector.episodes is not None:
+            collision_count += len(collision_pairs)
+            events = detector.episode_events
+            if events:
+                if detector.alerts:
+                    vanet.send_warnings(vehicles_data, detector.alerts)
+                profiler.lap("disseminate")
                 
-                # Log to console
-                message = f"Collision risk: {v1} and {v2} in {ttc:.1f}s"
-                print(message)
+                for event in events:
+                    if alert_buffer is not None:
+                        alert_buffer.put(*episode_row(event))
+                    print(f"[Time {format_sim_time(event.time)}] {EPISODE_EVENTS[event.event]}: "
+                          f"{event.vehicle1} and {event.vehicle2}, TTC {event.ttc:.2f}s "
+                          f"(min {event.min_ttc:.2f}s, {SEVERITY_LEVELS[event.max_severity]})")
+                profiler.lap("report")
         
         # Update demo window (Approach 3)
-        if collision_pairs:
+        elif collision_pairs:
             collision_count += len(collision_pairs)
             vanet.send_warnings(vehicles_data, collision_pairs)
+            profiler.lap("disseminate")
             
-            # Calculate elapsed simulation time
-            elapsed_time = step * step_length
-            formatted_time = f"{int(elapsed_time/60):02d}:{int(elapsed_time%60):02d}.{int((elapsed_time%1)*10):01d}"
+            # Simulation time on the detector's clock, the same as in the collision log
+            formatted_time = format_sim_time(collision_pairs.time)
             
-            # Send collision data to demo window with actual time
-            for v1, v2, ttc in collision_pairs:
-                severity = detector._calculate_severity(ttc, 
-                                                    calculate_distance(vehicles_data[v1]['position'], 
-                                                                    vehicles_data[v2]['position']),
-                                                    vehicles_data[v1]['speed'],
-                                                    vehicles_data[v2]['speed'])
-                # Add to demo window queue with formatted time
-                collision_queue.put((formatted_time, v1, v2, ttc, severity))
+            # Send collision data to demo window with actual time; one row per pair
+            ids1, ids2 = collision_pairs.vehicle_ids()
+            ttc_text = [f"{ttc:.2f}" for ttc in collision_pairs.ttc.tolist()]
+            if alert_buffer is not None:
+                severity = [SEVERITY_LEVELS[code] for code in collision_pairs.severity.tolist()]
+                for v1, v2, ttc, level in zip(ids1, ids2, ttc_text, severity):
+                    alert_buffer.put((v1, v2), (formatted_time, v1, v2, ttc + "s", level))
             
             # Log collisions to console with formatted time
-            for v1, v2, ttc in collision_pairs:
-                print(f"[Time {formatted_time}] WARNING: Potential collision between {v1} and {v2} in {ttc:.2f} seconds!")
+            print(''.join(f"[Time {formatted_time}] WARNING: Potential collision between {v1} and {v2} in {ttc} seconds!\n"
+                          for v1, v2, ttc in zip(ids1, ids2, ttc_text)), end='')
+            profiler.lap("report")
         
+        if analytics:
+            analytics.advance(collision_pairs.time)
+        profiler.end_step(len(vehicle_ids), len(collision_pairs))
         step += 1
     
+    if code_profile:
+        code_profile.disable()
+    sumo_steps.close()
+    
     # Signal the demo window that simulation is complete
-    collision_queue.put("END")
+    if alert_buffer is not None:
+        alert_buffer.close()
     
     print("=============================================")
     print(f"Simulation completed. Detected {collision_count} potential collisions.")
+    if detector.episodes is not None:
+        print(f"Alert episodes: {detector.episodes.opened} opened")
     print(f"Total simulation time: {step * step_length:.2f} seconds")
+    if max_hops > 1:
+        print(vanet.format_flood_summary())
+    close_simulation(detector, vanet, profiler)
+    print(profiler.format_summary())
+    
+    if recorder:
+        recorder.close()
+        print(f"Vehicle trace written to {record_path} (replay with src/replay.py)")
+    
+    if analytics:
+        analytics.write(analytics_path)
+        print(f"Log analytics summary written to {analytics_path}")
+    
+    if timings_path:
+        profiler.export_json(timings_path + ".json")
+        profiler.export_csv(timings_path + ".csv")
+        print(f"Step timings written to {timings_path}.json and {timings_path}.csv")
+    
+    if code_profile:
+        import pstats
+        code_profile.dump_stats("data/profile.prof")
+        pstats.Stats(code_profile).sort_stats("cumulative").print_stats(20)
+        print("Full profile written to data/profile.prof")
+
+def close_simulation(detector, vanet, profiler=None):
+    """Flush the buffered collision and communication logs, then close TraCI"""
+    import traci
+    
+    # Buffered logs are also flushed at interpreter exit if the loop raises
+    flush_start = time.perf_counter()
+    detector.close()
+    vanet.close()
+    if profiler is not None:
+        profiler.final_flush_time = time.perf_counter() - flush_start
     traci.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run VANET collision detection simulation")
     parser.add_argument("--gui", action="store_true", help="Run with SUMO GUI")
+    parser.add_argument("--no-window", action="store_true",
+                        help="Headless run: do not open the Tk demo window (Tk is then never imported)")
+    parser.add_argument("--startup-budget-ms", type=float, default=None,
+                        help="Warn when startup (imports and setup, excluding the SUMO launch) takes longer")
+    parser.add_argument("--backend", choices=["vectorized", "sharded", "scalar"], default="vectorized",
+                        help="Collision detection backend")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes of the sharded backend (default: CPU count)")
+    parser.add_argument("--shard-min-vehicles", type=int, default=None,
+                        help="Steps with fewer vehicles are not sharded but evaluated in the main process "
+                             "(sharded backend, default: 20000)")
+    parser.add_argument("--ttc-model", choices=["point", "obb"], default="point",
+                        help="Treat vehicles as points or sweep their length x width boxes")
+    parser.add_argument("--alerts", choices=["raw", "episodes"], default="raw",
+                        help="Report every detection of every step, or one event per alert episode change")
+    parser.add_argument("--log-format", choices=["csv", "columnar"], default="csv",
+                        help="Write text CSV logs or binary columnar logs (convert with columnar_log.py)")
+    parser.add_argument("--max-hops", type=int, default=1,
+                        help="Relay warnings over up to this many hops (1 = direct warnings only)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Step SUMO in a background thread, overlapping step N+1 with detection on step N")
+    parser.add_argument("--pipeline-depth", type=int, default=2,
+                        help="Steps the SUMO thread may run ahead of detection (--pipeline)")
+    parser.add_argument("--steps", type=int, default=1000, help="Number of simulation steps")
+    parser.add_argument("--profile", action="store_true",
+                        help="Run the simulation loop under cProfile and save data/profile.prof")
+    parser.add_argument("--timings", metavar="PATH", default=None,
+                        help="Export per-step stage timings to PATH.json and PATH.csv")
+    parser.add_argument("--record", metavar="DIR", default=None,
+                        help="Record the per-step vehicle state to a trace directory for replay.py")
+    parser.add_argument("--analytics", metavar="PATH", default=None,
+                        help="Compute delivery, TTC, alert rate and latency statistics live and write them to PATH")
     args = parser.parse_args()
     
-    run_simulation(use_gui=args.gui)
\ No newline at end of file
+    run_simulation(use_gui=args.gui, backend=args.backend,
+                   log_format=args.log_format, max_hops=args.max_hops,
+                   profile=args.profile, timings_path=args.timings, record_path=args.record,
+                   workers=args.workers, shard_min_vehicles=args.shard_min_vehicles, ttc_model=args.ttc_model,
+                   alerts=args.alerts, pipeline=args.pipeline, pipeline_depth=args.pipeline_depth,
+                   steps=args.steps, window=not args.no_window, startup_budget_ms=args.startup_budget_ms,
+                   analytics_path=args.analytics)
@@ -0,0 +1,126 @@
+import csv
+import json
+import time
+import numpy as np
+
+# Stages of one simulation step, in the order they run in main.run_simulation; logging is the
+# time the detector and the VANET model spend handing records to their log writers
+STAGES = ("simulation_step", "collect", "detect", "gui", "disseminate", "report", "logging")
+
+class StepProfiler:
+    """
+    Low-overhead per-stage timer for the simulation loop
+
+    The loop calls ``begin_step`` once, ``lap(stage)`` after each stage and
+    ``end_step`` at the end. A lap charges the time since the previous lap to
+    the named stage, so instrumentation costs one perf_counter call per stage.
+    """
+
+    def __init__(self, step_length=0.1, stages=STAGES):
+        """
+        Initialize an empty profile
+
+        Args:
+            step_length: Simulated seconds per step, used for the real-time factor
+            stages: Names of the timed stages
+        """
+        self.step_length = step_length
+        self.stages = tuple(stages)
+        self._stage_index = {name: i for i, name in enumerate(self.stages)}
+        self.rows = []
+        self.vehicle_counts = []
+        self.pair_counts = []
+        self._current = None
+        self._last = None
+        self._step_start = None
+        self.step_totals = []
+        self.startup_time = None  # Seconds of startup before the first step, when measured
+        self.final_flush_time = None  # Seconds spent flushing the logs after the last step, when measured
+
+    def begin_step(self):
+        """Start timing a new step"""
+        self._current = [0.0] * len(self.stages)
+        self._step_start = self._last = time.perf_counter()
+
+    def lap(self, stage):
+        """Charge the time since the previous lap to stage"""
+        now = time.perf_counter()
+        self._current[self._stage_index[stage]] += now - self._last
+        self._last = now
+
+    def end_step(self, vehicle_count=0, pair_count=0):
+        """Finish the current step and record its counts"""
+        self.step_totals.append(time.perf_counter() - self._step_start)
+        self.rows.append(self._current)
+        self.vehicle_counts.append(vehicle_count)
+        self.pair_counts.append(pair_count)
+        self._current = None
+
+    def summary(self):
+        """
+        Aggregate the recorded steps
+
+        Returns:
+            Dictionary with step count, wall and simulated time, real-time factor,
+            vehicle/pair count statistics and per-stage latency percentiles in ms
+        """
+        steps = len(self.rows)
+        if steps == 0:
+            return {"steps": 0, "startup_time": self.startup_time, "final_flush_time": self.final_flush_time}
+
+        timings = np.array(self.rows) * 1000.0
+        totals = np.array(self.step_totals) * 1000.0
+        wall_time = float(totals.sum()) / 1000.0
+        simulated_time = steps * self.step_length
+
+        def describe(values):
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            return {"mean": float(values.mean()), "p50": float(p50), "p95": float(p95),
+                    "p99": float(p99), "max": float(values.max()), "total": float(values.sum())}
+
+        stages = {name: describe(timings[:, i]) for i, name in enumerate(self.stages)}
+        stages["step"] = describe(totals)
+
+        return {
+            "steps": steps,
+            "startup_time": self.startup_time,
+            "final_flush_time": self.final_flush_time,
+            "wall_time": wall_time,
+            "simulated_time": simulated_time,
+            "real_time_factor": simulated_time / wall_time if wall_time > 0 else float('inf'),
+            "vehicles": {"mean": float(np.mean(self.vehicle_counts)), "max": int(np.max(self.vehicle_counts))},
+            "pairs": {"mean": float(np.mean(self.pair_counts)), "max": int(np.max(self.pair_counts))},
+            "stages_ms": stages,
+        }
+
+    def export_json(self, path):
+        """Write the summary as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def export_csv(self, path):
+        """Write one row per step with stage times in ms and vehicle/pair counts"""
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(("step",) + self.stages + ("total", "vehicles", "pairs"))
+            for step, (row, total, vehicles, pairs) in enumerate(zip(self.rows, self.step_totals,
+                                                                    self.vehicle_counts, self.pair_counts)):
+                writer.writerow([step] + [f"{value * 1000.0:.3f}" for value in row] +
+                                [f"{total * 1000.0:.3f}", vehicles, pairs])
+
+    def format_summary(self):
+        """Human-readable table of the summary for the console"""
+        summary = self.summary()
+        if summary["steps"] == 0:
+            return "No steps profiled"
+
+        startup = f"  startup: {summary['startup_time'] * 1000:.0f} ms" if summary["startup_time"] is not None else ""
+        lines = [f"Steps: {summary['steps']}  wall time: {summary['wall_time']:.2f}s  "
+                 f"real-time factor: {summary['real_time_factor']:.1f}x{startup}",
+                 f"{'stage':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'total s':>10}"]
+        for name, stats in summary["stages_ms"].items():
+            lines.append(f"{name:<16}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}"
+                         f"{stats['total'] / 1000.0:>10.2f}")
+        if summary["final_flush_time"] is not None:
+            lines.append(f"final log flush: {summary['final_flush_time'] * 1000:.1f} ms")
+        return "\n".join(lines)
@@ -0,0 +1,206 @@
+import math
+import os
+import numpy as np
+from collections import namedtuple
+from multiprocessing import Pool, resource_tracker, shared_memory
+from collision_detection import evaluate_pairs
+from spatial_index import UniformGrid
+
+# Vehicle columns shared with the workers, one float64 row each
+COLUMNS = ("x", "y", "vx", "vy", "speed", "hx", "hy", "length", "width")
+
+# Column views over the shared block; has the attributes evaluate_pairs reads
+SharedColumns = namedtuple("SharedColumns", COLUMNS)
+
+# Tile grid over the bounding box of one step: origin, tile size and tile counts
+TileLayout = namedtuple("TileLayout", ("x0", "y0", "tile_width", "tile_height", "cols", "rows"))
+
+# Shared memory block the current worker process is attached to
+_attached = {}
+
+def tile_layout(x, y, tiles, min_tile_size):
+    """
+    Split the bounding box of the positions into roughly square tiles
+
+    Args:
+        x, y: Arrays of vehicle positions in meters
+        tiles: Target number of tiles
+        min_tile_size: Smallest tile edge in meters, so halos stay small relative to tiles
+
+    Returns:
+        TileLayout covering every position
+    """
+    x0, y0 = float(x.min()), float(y.min())
+    width = max(float(x.max()) - x0, min_tile_size)
+    height = max(float(y.max()) - y0, min_tile_size)
+
+    cols = max(1, min(int(round(math.sqrt(tiles * width / height))), int(width // min_tile_size)))
+    rows = max(1, min(int(math.ceil(tiles / cols)), int(height // min_tile_size)))
+    return TileLayout(x0, y0, width / cols, height / rows, cols, rows)
+
+def tile_of(x, y, layout):
+    """Index of the tile owning each position (row-major over the tile grid)"""
+    col = np.clip(np.floor((x - layout.x0) / layout.tile_width), 0, layout.cols - 1).astype(np.int64)
+    row = np.clip(np.floor((y - layout.y0) / layout.tile_height), 0, layout.rows - 1).astype(np.int64)
+    return col * layout.rows + row
+
+def _attach(name):
+    """Attach the worker to a shared block, dropping the previous one after a resize"""
+    shm = _attached.get(name)
+    if shm is None:
+        for old in _attached.values():
+            old.close()
+        _attached.clear()
+        shm = _attached[name] = shared_memory.SharedMemory(name=name)
+    return shm
+
+def _columns(buffer, capacity, count):
+    block = np.ndarray((len(COLUMNS), capacity), dtype=np.float64, buffer=buffer)
+    return SharedColumns(*block[:, :count])
+
+def _detect_tile(task):
+    """
+    Detect the pairs owned by one tile in a worker process
+
+    The tile looks at its own vehicles plus every vehicle in a halo of
+    distance_threshold around it, so all neighbours of its own vehicles are
+    visible. A pair is kept only when its first (lower row) vehicle belongs to
+    the tile; every vehicle has exactly one owning tile, so every pair is
+    reported by exactly one tile.
+
+    Returns:
+        Tuple (candidate pair count, evaluate_pairs result) for the tile's own pairs
+    """
+    name, capacity, count, layout, tile, distance_threshold, time_threshold, ttc_model = task
+    columns = _columns(_attach(name).buf, capacity, count)
+    x, y = columns.x, columns.y
+
+    col, row = divmod(tile, layout.rows)
+    # Slightly wider than the threshold so floating point rounding at tile borders cannot drop a neighbour
+    halo = distance_threshold + 1e-6 * max(layout.tile_width, layout.tile_height)
+    left = layout.x0 + col * layout.tile_width
+    bottom = layout.y0 + row * layout.tile_height
+    local = np.flatnonzero((x >= left - halo) & (x <= left + layout.tile_width + halo) &
+                           (y >= bottom - halo) & (y <= bottom + layout.tile_height + halo))
+
+    # Local rows are ascending, so the grid's row-major pairs map to global pairs with idx1 < idx2
+    grid = UniformGrid(x[local], y[local], distance_threshold)
+    local1, local2, _ = grid.pairs_within(distance_threshold)
+    idx1, idx2 = local[local1], local[local2]
+    owned = tile_of(x[idx1], y[idx1], layout) == tile
+    idx1, idx2 = idx1[owned], idx2[owned]
+
+    return len(idx1), evaluate_pairs(columns, idx1, idx2, distance_threshold, time_threshold, ttc_model)
+
+class ShardedDetection:
+    """
+    Vectorized pair evaluation split over spatial tiles in a process pool
+
+    Every step, the vehicle columns are copied once into a shared memory block
+    that the workers map directly, so only the tile description and the
+    detected pairs cross the process boundary. Results are merged back into the
+    row-major pair order of the single-process vectorized backend.
+
+    Dispatching a step to the pool costs several milliseconds regardless of its
+    size, so steps with fewer than min_vehicles vehicles are evaluated in
+    process instead, and the pool is only started by the first larger step.
+    """
+
+    def __init__(self, workers=None, tiles_per_worker=4, min_tile_size_factor=4.0, min_vehicles=20000):
+        """
+        Set up the sharded evaluation
+
+        Args:
+            workers: Number of worker processes (defaults to the CPU count)
+            tiles_per_worker: Tiles per worker, more tiles even out uneven traffic density
+            min_tile_size_factor: Smallest tile edge as a multiple of the distance threshold
+            min_vehicles: Smallest step evaluated in the worker pool; smaller steps run in process.
+                          The default is an estimate of the break-even point with 4 cores, not
+                          a measurement; tune it per machine with benchmark.py
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.tiles = self.workers * tiles_per_worker
+        self.min_tile_size_factor = min_tile_size_factor
+        self.min_vehicles = min_vehicles
+        self.pool = None
+        self.shm = None
+        self.capacity = 0
+        self.candidates = 0  # Candidate pairs evaluated in the last step
+
+    def _start(self):
+        """Start the worker pool"""
+        if os.name == "posix":
+            # Workers must share the parent's resource tracker; otherwise each one starts its
+            # own, which unlinks the shared block when the worker exits
+            resource_tracker.ensure_running()
+        self.pool = Pool(processes=self.workers)
+
+    def _reserve(self, count):
+        """Make sure the shared block holds at least count vehicles, growing it geometrically"""
+        if count <= self.capacity:
+            return
+        self._release()
+        self.capacity = max(count, 2 * self.capacity, 1024)
+        self.shm = shared_memory.SharedMemory(create=True, size=len(COLUMNS) * self.capacity * 8)
+
+    def _release(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+            self.capacity = 0
+
+    def evaluate(self, arrays, distance_threshold, time_threshold, ttc_model="point"):
+        """
+        Find the pairs within the thresholds across all tiles
+
+        Args:
+            arrays: VehicleArrays for the current step
+            distance_threshold: Maximum distance to consider for collision detection
+            time_threshold: Time-to-collision threshold in seconds
+            ttc_model: TTC model passed on to evaluate_pairs
+
+        Returns:
+            Tuple (idx1, idx2, ttc, distance, relative_speed, severity_code) in row-major pair order
+        """
+        count = len(arrays)
+        self.candidates = 0
+        if count < 2:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0), np.empty(0), np.empty(0), empty
+        if count < self.min_vehicles:
+            grid = UniformGrid.from_arrays(arrays, distance_threshold)
+            idx1, idx2, _ = grid.pairs_within(distance_threshold)
+            self.candidates = len(idx1)
+            return evaluate_pairs(arrays, idx1, idx2, distance_threshold, time_threshold, ttc_model)
+
+        if self.pool is None:
+            self._start()
+        self._reserve(count)
+        block = np.ndarray((len(COLUMNS), self.capacity), dtype=np.float64, buffer=self.shm.buf)
+        for i, column in enumerate(COLUMNS):
+            block[i, :count] = getattr(arrays, column)
+        del block
+
+        layout = tile_layout(arrays.x, arrays.y, self.tiles, self.min_tile_size_factor * distance_threshold)
+        occupancy = np.bincount(tile_of(arrays.x, arrays.y, layout), minlength=layout.cols * layout.rows)
+        # Busiest tiles first so a large tile does not start last and hold up the step
+        occupied = np.flatnonzero(occupancy)
+        occupied = occupied[np.argsort(-occupancy[occupied], kind='stable')]
+
+        tasks = [(self.shm.name, self.capacity, count, layout, int(tile), distance_threshold, time_threshold,
+                  ttc_model) for tile in occupied.tolist()]
+        candidates, results = zip(*self.pool.map(_detect_tile, tasks, chunksize=1))
+        self.candidates = sum(candidates)
+
+        columns = [np.concatenate(parts) for parts in zip(*results)]
+        order = np.lexsort((columns[1], columns[0]))
+        return tuple(column[order] for column in columns)
+
+    def close(self):
+        """Stop the workers and free the shared block"""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        self._release()
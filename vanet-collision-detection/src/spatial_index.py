@@ -0,0 +1,186 @@
+import math
+import numpy as np
+
+class UniformGrid:
+    """
+    Uniform hash grid over vehicle positions for fixed-radius neighbour queries
+
+    Vehicles are bucketed into square cells of ``cell_size`` meters. A radius
+    query only has to look at the cells within ``ceil(r / cell_size)`` rings of
+    a vehicle's own cell, so both queries below run in roughly linear time for
+    realistic traffic densities instead of comparing every vehicle pair.
+    """
+
+    def __init__(self, x, y, cell_size):
+        """
+        Build the grid for one set of positions
+
+        Args:
+            x, y: Arrays of vehicle positions in meters, one row per vehicle
+            cell_size: Edge length of a grid cell in meters
+        """
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.cell_size = float(cell_size)
+        self._build()
+
+    @classmethod
+    def from_arrays(cls, arrays, cell_size):
+        """Build a grid over the positions of a VehicleArrays snapshot"""
+        return cls(arrays.x, arrays.y, cell_size)
+
+    def __len__(self):
+        return len(self.x)
+
+    def _build(self):
+        """Sort vehicles by cell key and record where each occupied cell starts"""
+        n = len(self.x)
+        if n == 0:
+            self.cx = self.cy = self.keys = np.empty(0, dtype=np.int64)
+            self.order = np.empty(0, dtype=np.int64)
+            self.cell_keys = self.cell_starts = self.cell_counts = np.empty(0, dtype=np.int64)
+            self.origin = (0, 0)
+            self.stride = 1
+            return
+
+        cx = np.floor(self.x / self.cell_size).astype(np.int64)
+        cy = np.floor(self.y / self.cell_size).astype(np.int64)
+        self.origin = (int(cx.min()), int(cy.min()))
+        self.cx = cx - self.origin[0]
+        self.cy = cy - self.origin[1]
+
+        # Leave room on both sides of the y range so neighbour keys never alias
+        self._margin = 1
+        self.stride = int(self.cy.max()) + 2 * self._margin + 1
+        self.keys = self._key(self.cx, self.cy)
+
+        self.order = np.argsort(self.keys, kind='stable')
+        sorted_keys = self.keys[self.order]
+        self.cell_keys, self.cell_starts, self.cell_counts = np.unique(
+            sorted_keys, return_index=True, return_counts=True)
+
+    def _key(self, cx, cy):
+        return cx * self.stride + (cy + self._margin)
+
+    def _rings(self, r):
+        """Number of cell rings that have to be searched for radius r"""
+        rings = int(math.ceil(r / self.cell_size))
+        if rings > self._margin:
+            # Widen the key space so the extra rings still map to unique keys
+            self._margin = rings
+            self.stride = int(self.cy.max()) + 2 * rings + 1
+            self.keys = self._key(self.cx, self.cy)
+            self.cell_keys = self.keys[self.order][self.cell_starts]
+        return rings
+
+    def _lookup(self, keys):
+        """Return (found mask, cell index) for an array of cell keys"""
+        pos = np.searchsorted(self.cell_keys, keys)
+        pos = np.minimum(pos, len(self.cell_keys) - 1)
+        found = self.cell_keys[pos] == keys
+        return found, pos
+
+    def pairs_within(self, r):
+        """
+        Find all vehicle pairs closer than or at distance r
+
+        Args:
+            r: Query radius in meters
+
+        Returns:
+            Tuple (idx1, idx2, distance) of arrays with idx1 < idx2, sorted in
+            row-major order (the order of a nested i < j loop)
+        """
+        empty = np.empty(0, dtype=np.int64)
+        if len(self.x) < 2:
+            return empty, empty, np.empty(0)
+
+        rings = self._rings(r)
+
+        # Half neighbourhood so every unordered pair of cells is visited once
+        offsets = [(dx, dy) for dx in range(-rings, rings + 1) for dy in range(0, rings + 1)
+                   if dy > 0 or dx >= 0]
+
+        cell_cx = self.cx[self.order[self.cell_starts]]
+        cell_cy = self.cy[self.order[self.cell_starts]]
+        all_cells = np.arange(len(self.cell_keys))
+
+        first_parts = []
+        second_parts = []
+        for dx, dy in offsets:
+            found, other = self._lookup(self._key(cell_cx + dx, cell_cy + dy))
+            cells_a = all_cells[found]
+            cells_b = other[found]
+            if len(cells_a) == 0:
+                continue
+            p, q = self._expand(cells_a, cells_b)
+            if dx == 0 and dy == 0:
+                keep = p < q
+                p, q = p[keep], q[keep]
+            first_parts.append(p)
+            second_parts.append(q)
+
+        if not first_parts:
+            return empty, empty, np.empty(0)
+
+        p = np.concatenate(first_parts)
+        q = np.concatenate(second_parts)
+        idx1 = np.minimum(p, q)
+        idx2 = np.maximum(p, q)
+
+        ddx = self.x[idx2] - self.x[idx1]
+        ddy = self.y[idx2] - self.y[idx1]
+        distance = np.sqrt(ddx * ddx + ddy * ddy)
+        near = distance <= r
+        idx1, idx2, distance = idx1[near], idx2[near], distance[near]
+
+        order = np.argsort(idx1 * len(self.x) + idx2, kind='stable')
+        return idx1[order], idx2[order], distance[order]
+
+    def _expand(self, cells_a, cells_b):
+        """Enumerate every (vehicle in cell a, vehicle in cell b) combination"""
+        count_a = self.cell_counts[cells_a]
+        count_b = self.cell_counts[cells_b]
+        sizes = count_a * count_b
+        total = int(sizes.sum())
+
+        block = np.repeat(np.arange(len(cells_a)), sizes)
+        local = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        width = count_b[block]
+        p = self.order[self.cell_starts[cells_a][block] + local // width]
+        q = self.order[self.cell_starts[cells_b][block] + local % width]
+        return p, q
+
+    def neighbors(self, i, r):
+        """
+        Find all vehicles within distance r of vehicle i (excluding i itself)
+
+        Args:
+            i: Row index of the query vehicle
+            r: Query radius in meters
+
+        Returns:
+            Tuple (indices, distance) with indices in ascending order
+        """
+        rings = self._rings(r)
+        span = np.arange(-rings, rings + 1)
+        ncx = (self.cx[i] + span)[:, None]
+        ncy = (self.cy[i] + span)[None, :]
+        found, cells = self._lookup(self._key(ncx, ncy).ravel())
+        cells = cells[found]
+
+        members = [self.order[s:s + c] for s, c in zip(self.cell_starts[cells], self.cell_counts[cells])]
+        candidates = np.concatenate(members) if members else np.empty(0, dtype=np.int64)
+        candidates = candidates[candidates != i]
+
+        ddx = self.x[candidates] - self.x[i]
+        ddy = self.y[candidates] - self.y[i]
+        distance = np.sqrt(ddx * ddx + ddy * ddy)
+        near = distance <= r
+        candidates, distance = candidates[near], distance[near]
+
+        order = np.argsort(candidates)
+        return candidates[order], distance[order]
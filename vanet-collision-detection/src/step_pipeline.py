@@ -0,0 +1,152 @@
+import queue
+import threading
+
+class SerialSteps:
+    """
+    Step SUMO and fetch the vehicle state in the calling thread
+
+    The loop calls ``next_step`` for every step and processes the returned
+    state before asking for the next one.
+    """
+
+    def __init__(self, collector, steps, profiler):
+        """
+        Args:
+            collector: SubscriptionCollector bound to the TraCI connection
+            steps: Number of simulation steps to run
+            profiler: StepProfiler charged with the simulation_step stage
+        """
+        self.collector = collector
+        self.connection = collector.connection
+        self.remaining = steps
+        self.profiler = profiler
+
+    def next_step(self):
+        """
+        Advance SUMO by one step
+
+        Returns:
+            Tuple (vehicle_ids, vehicles_data), vehicles_data being empty VehicleArrays
+            when no vehicles are in the simulation; None after the last step
+        """
+        if self.remaining <= 0:
+            return None
+        self.remaining -= 1
+
+        self.connection.simulationStep()
+        self.profiler.lap("simulation_step")
+        vehicle_ids = self.connection.vehicle.getIDList()
+        return vehicle_ids, self.collector.collect(vehicle_ids)
+
+    def set_colors(self, updates):
+        """Send (vehicle_id, color) updates to the SUMO GUI"""
+        for vehicle_id, color in updates:
+            self.connection.vehicle.setColor(vehicle_id, color)
+
+    def close(self):
+        pass
+
+
+class _Failure:
+    """Exception raised in the SUMO thread, handed over to the loop"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class PipelinedSteps:
+    """
+    Step SUMO and fetch the vehicle state in a background thread, ahead of the loop
+
+    While the loop detects and disseminates on step N, the SUMO thread already
+    runs step N+1 and waits on the TraCI socket for its results. Steps are
+    handed over through a bounded FIFO queue: the SUMO thread never runs more
+    than depth steps ahead, and the loop receives the steps in order.
+
+    The TraCI connection is only used by the SUMO thread. Color updates are
+    therefore queued and sent by that thread before its next simulationStep,
+    so highlights in the SUMO GUI trail the detections by up to depth steps.
+    Nothing else depends on the loop's results, so the detections are the
+    same as in serial mode.
+    """
+
+    def __init__(self, collector, steps, profiler, depth=2):
+        """
+        Start the SUMO thread
+
+        Args:
+            collector: SubscriptionCollector bound to the TraCI connection
+            steps: Number of simulation steps to run
+            profiler: StepProfiler; simulation_step is charged with the time the loop
+                      waited for the SUMO thread, i.e. the part the overlap did not hide
+            depth: Maximum number of fetched steps waiting for the loop
+        """
+        self.collector = collector
+        self.connection = collector.connection
+        self.profiler = profiler
+        self._steps = queue.Queue(maxsize=depth)
+        self._colors = []
+        self._colors_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(steps,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, steps):
+        try:
+            vehicle_ids = ()
+            for _ in range(steps):
+                self._send_colors(vehicle_ids)
+                self.connection.simulationStep()
+                vehicle_ids = self.connection.vehicle.getIDList()
+                if not self._put((vehicle_ids, self.collector.collect(vehicle_ids))):
+                    return
+            self._put(None)
+        except Exception as e:
+            self._put(_Failure(e))
+
+    def _put(self, item):
+        """Hand an item to the loop, blocking while the queue is full; False once stopped"""
+        while not self._stop.is_set():
+            try:
+                self._steps.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _send_colors(self, vehicle_ids):
+        with self._colors_lock:
+            updates, self._colors = self._colors, []
+        if not updates:
+            return
+        # Vehicles may have left since the loop saw them
+        present = set(vehicle_ids)
+        for vehicle_id, color in updates:
+            if vehicle_id in present:
+                self.connection.vehicle.setColor(vehicle_id, color)
+
+    def next_step(self):
+        """
+        Take the next fetched step, waiting for the SUMO thread if it is not ready yet
+
+        Returns:
+            Tuple (vehicle_ids, vehicles_data), vehicles_data being empty VehicleArrays
+            when no vehicles are in the simulation; None after the last step
+        """
+        item = self._steps.get()
+        self.profiler.lap("simulation_step")
+        if isinstance(item, _Failure):
+            raise item.error
+        return item
+
+    def set_colors(self, updates):
+        """Queue (vehicle_id, color) updates for the SUMO thread"""
+        if updates:
+            with self._colors_lock:
+                self._colors.extend(updates)
+
+    def close(self):
+        """Stop the SUMO thread; must be called before the TraCI connection is closed"""
+        self._stop.set()
+        self._thread.join()
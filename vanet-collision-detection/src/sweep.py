@@ -0,0 +1,166 @@
+import argparse
+import csv
+import itertools
+import os
+import random
+import tempfile
+import time
+from multiprocessing import Pool
+from collision_detection import CollisionDetector, SEVERITY_LEVELS
+from vanet_communication import VanetNetwork
+from replay import replay
+
+# Swept parameters and the component they configure
+PARAMETERS = ("time_threshold", "distance_threshold", "transmission_range", "packet_loss_rate")
+
+def configuration_grid(time_thresholds, distance_thresholds, transmission_ranges, packet_loss_rates):
+    """Cartesian product of the parameter values as a list of configuration dictionaries"""
+    return [dict(zip(PARAMETERS, values)) for values in
+            itertools.product(time_thresholds, distance_thresholds, transmission_ranges, packet_loss_rates)]
+
+def _build(config, log_dir, log_format, backend):
+    detector = CollisionDetector(time_threshold=config["time_threshold"],
+                                 distance_threshold=config["distance_threshold"],
+                                 backend=backend, log_format=log_format, log_dir=log_dir)
+    vanet = VanetNetwork(transmission_range=config["transmission_range"],
+                         packet_loss_rate=config["packet_loss_rate"],
+                         log_format=log_format, log_dir=log_dir)
+    return detector, vanet
+
+def _run_sumo(detector, vanet, sumo_cmd, steps, port, label, seed):
+    """Run one live SUMO instance on its own TraCI port and label"""
+    import traci
+    from traci_collector import SubscriptionCollector
+
+    traci.start(sumo_cmd + ["--seed", str(seed)], port=port, label=label)
+    connection = traci.getConnection(label)
+    collector = SubscriptionCollector(connection)
+    try:
+        for _ in range(steps):
+            connection.simulationStep()
+            # Steps without vehicles still advance the detector's clock, as in main.py
+            vehicles = collector.collect(connection.vehicle.getIDList())
+            detector.detect_collisions(vehicles)
+            if detector.alerts:
+                vanet.send_warnings(vehicles, detector.alerts)
+    finally:
+        detector.close()
+        vanet.close()
+        connection.close()
+
+def evaluate_configuration(task):
+    """
+    Evaluate one configuration in a worker process
+
+    Args:
+        task: Dictionary with the configuration and run options (see run_sweep)
+
+    Returns:
+        Result row with the configuration, detection/severity counts and delivery counts
+    """
+    config = task["config"]
+
+    # Packet loss draws use the random module; every configuration starts from the same
+    # seed so differences between rows come from the parameters, not from the draws
+    random.seed(task["seed"])
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_dir = os.path.join(task["keep_logs"], f"config_{task['index']:04d}") if task["keep_logs"] else temp_dir
+        detector, vanet = _build(config, log_dir, task["log_format"], task["backend"])
+
+        start = time.perf_counter()
+        if task["trace"]:
+            replay(task["trace"], detector, vanet)
+        else:
+            _run_sumo(detector, vanet, task["sumo_cmd"], task["steps"], task["base_port"] + task["index"],
+                      f"sweep{task['index']}", task["seed"])
+        elapsed = time.perf_counter() - start
+
+    row = dict(config)
+    row["detections"] = int(detector.severity_counts.sum())
+    for level, count in zip(SEVERITY_LEVELS, detector.severity_counts.tolist()):
+        row[level] = count
+    row["messages_sent"] = vanet.messages_sent
+    row["messages_delivered"] = vanet.messages_delivered
+    row["delivery_ratio"] = vanet.messages_delivered / vanet.messages_sent if vanet.messages_sent else 0.0
+    row["wall_time"] = elapsed
+    return row
+
+def run_sweep(configs, trace=None, sumo_cmd=None, steps=1000, workers=None, seed=0, base_port=8873,
+              log_format="columnar", backend="vectorized", keep_logs=None):
+    """
+    Evaluate configurations in parallel against a trace or live SUMO instances
+
+    Args:
+        configs: List of configuration dictionaries (see configuration_grid)
+        trace: Trace directory to replay; takes precedence over sumo_cmd
+        sumo_cmd: SUMO command line for live runs, e.g. ["sumo", "-c", "simulation/sumo_config.sumocfg"]
+        steps: Number of steps of a live run
+        workers: Number of worker processes (defaults to the CPU count)
+        seed: Seed for the packet-loss draws and for SUMO
+        base_port: TraCI port of the first configuration; configuration i uses base_port + i
+        log_format: Log format used in the workers
+        backend: Collision detection backend
+        keep_logs: Directory to keep each configuration's logs in (discarded when None)
+
+    Returns:
+        List of result rows in configuration order
+    """
+    if trace is None and sumo_cmd is None:
+        raise ValueError("Either a trace or a SUMO command is required")
+
+    tasks = [{"index": i, "config": config, "trace": trace, "sumo_cmd": sumo_cmd, "steps": steps,
+              "seed": seed, "base_port": base_port, "log_format": log_format, "backend": backend,
+              "keep_logs": keep_logs}
+             for i, config in enumerate(configs)]
+
+    with Pool(processes=workers) as pool:
+        return pool.map(evaluate_configuration, tasks, chunksize=1)
+
+def write_results(rows, path):
+    """Write the result rows as one CSV table"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep detector and network parameters in parallel")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--trace", help="Recorded trace directory to replay for every configuration")
+    source.add_argument("--sumo-config", help="SUMO configuration to run live for every configuration")
+    parser.add_argument("--time-thresholds", nargs="+", type=float, default=[3.0])
+    parser.add_argument("--distance-thresholds", nargs="+", type=float, default=[30.0])
+    parser.add_argument("--transmission-ranges", nargs="+", type=float, default=[100.0])
+    parser.add_argument("--packet-loss-rates", nargs="+", type=float, default=[0.05])
+    parser.add_argument("--steps", type=int, default=1000, help="Steps per live SUMO run")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-port", type=int, default=8873)
+    parser.add_argument("--backend", choices=["vectorized", "scalar"], default="vectorized")
+    parser.add_argument("--log-format", choices=["csv", "columnar"], default="columnar")
+    parser.add_argument("--keep-logs", default=None, help="Keep per-configuration logs under this directory")
+    parser.add_argument("--output", default="data/sweep_results.csv")
+    args = parser.parse_args()
+
+    sumo_cmd = None
+    if args.sumo_config:
+        sumo_home = os.environ.get('SUMO_HOME')
+        sumo_binary = os.path.join(sumo_home, 'bin', 'sumo') if sumo_home else 'sumo'
+        sumo_cmd = [sumo_binary, "-c", args.sumo_config]
+
+    configs = configuration_grid(args.time_thresholds, args.distance_thresholds,
+                                 args.transmission_ranges, args.packet_loss_rates)
+    print(f"Evaluating {len(configs)} configurations")
+    rows = run_sweep(configs, trace=args.trace, sumo_cmd=sumo_cmd, steps=args.steps, workers=args.workers,
+                     seed=args.seed, base_port=args.base_port, log_format=args.log_format,
+                     backend=args.backend, keep_logs=args.keep_logs)
+    write_results(rows, args.output)
+
+    for row in rows:
+        print(f"ttc<{row['time_threshold']:<5} dist<{row['distance_threshold']:<6} "
+              f"range={row['transmission_range']:<6} loss={row['packet_loss_rate']:<5} "
+              f"detections={row['detections']:<7} delivered={row['messages_delivered']}/{row['messages_sent']}")
+    print(f"Results written to {args.output}")
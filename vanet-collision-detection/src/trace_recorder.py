@@ -0,0 +1,168 @@
+import json
+import os
+import numpy as np
+from vehicle_arrays import VehicleArrays
+
+# One row per vehicle per step; vehicle is an index into the trace's ID table
+ROW_DTYPE = np.dtype([('vehicle', '<i4'), ('x', '<f8'), ('y', '<f8'), ('speed', '<f8'), ('angle', '<f8')])
+# One entry per recorded step pointing at its rows
+STEP_DTYPE = np.dtype([('step', '<i4'), ('start', '<i8'), ('count', '<i4')])
+
+class TraceRecorder:
+    """
+    Record the per-step vehicle state of a simulation into a binary trace
+
+    A trace is a directory with ``rows.bin`` (vehicle rows of all steps, back
+    to back), ``steps.bin`` (where each step's rows start) and ``meta.json``
+    (vehicle ID table with the static length/width of every vehicle). Steps
+    are buffered and appended in chunks.
+    """
+
+    def __init__(self, path, step_length=0.1, chunk_steps=100):
+        """
+        Create (overwrite) a trace directory
+
+        Args:
+            path: Trace directory
+            step_length: Simulated seconds per step
+            chunk_steps: Number of steps buffered before they are written
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.step_length = step_length
+        self.chunk_steps = chunk_steps
+
+        self.ids = []
+        self.lengths = []
+        self.widths = []
+        self._id_index = {}
+        self._chunk = []
+        self._rows_written = 0
+        self.step_count = 0
+
+        self._rows_file = open(os.path.join(path, "rows.bin"), 'wb')
+        self._steps_file = open(os.path.join(path, "steps.bin"), 'wb')
+
+    def record(self, step, vehicles):
+        """
+        Add one step
+
+        Args:
+            step: Simulation step number
+            vehicles: VehicleArrays (or vehicles_data dictionary) of the step
+        """
+        if not isinstance(vehicles, VehicleArrays):
+            vehicles = VehicleArrays.from_vehicles_data(vehicles)
+
+        codes = np.empty(len(vehicles), dtype=np.int32)
+        for i, vehicle_id in enumerate(vehicles.ids):
+            code = self._id_index.get(vehicle_id)
+            if code is None:
+                code = len(self.ids)
+                self._id_index[vehicle_id] = code
+                self.ids.append(vehicle_id)
+                self.lengths.append(float(vehicles.length[i]))
+                self.widths.append(float(vehicles.width[i]))
+            codes[i] = code
+
+        rows = np.empty(len(vehicles), dtype=ROW_DTYPE)
+        rows['vehicle'] = codes
+        rows['x'] = vehicles.x
+        rows['y'] = vehicles.y
+        rows['speed'] = vehicles.speed
+        rows['angle'] = vehicles.angle
+        self._chunk.append((step, rows))
+
+        if len(self._chunk) >= self.chunk_steps:
+            self._write_chunk()
+
+    def close(self):
+        """Write buffered steps and the metadata"""
+        if self._rows_file.closed:
+            return
+        self._write_chunk()
+        self._rows_file.close()
+        self._steps_file.close()
+
+        meta = {
+            "step_length": self.step_length,
+            "steps": self.step_count,
+            "rows": self._rows_written,
+            "ids": self.ids,
+            "lengths": self.lengths,
+            "widths": self.widths,
+        }
+        with open(os.path.join(self.path, "meta.json"), 'w') as f:
+            json.dump(meta, f)
+
+    def _write_chunk(self):
+        if not self._chunk:
+            return
+
+        index = np.empty(len(self._chunk), dtype=STEP_DTYPE)
+        start = self._rows_written
+        for i, (step, rows) in enumerate(self._chunk):
+            index[i] = (step, start, len(rows))
+            start += len(rows)
+
+        np.concatenate([rows for _, rows in self._chunk]).tofile(self._rows_file)
+        index.tofile(self._steps_file)
+        self._rows_written = start
+        self.step_count += len(self._chunk)
+        self._chunk = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TraceReader:
+    """Memory-mapped access to a trace written by TraceRecorder"""
+
+    def __init__(self, path):
+        """
+        Open a trace directory
+
+        Args:
+            path: Trace directory
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+
+        self.path = path
+        self.step_length = meta["step_length"]
+        self.ids = meta["ids"]
+        self.lengths = np.array(meta["lengths"], dtype=np.float64)
+        self.widths = np.array(meta["widths"], dtype=np.float64)
+
+        self.steps = self._map("steps.bin", STEP_DTYPE, meta["steps"])
+        self.rows = self._map("rows.bin", ROW_DTYPE, meta["rows"])
+
+    def _map(self, name, dtype, count):
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode='r', shape=(count,))
+
+    def __len__(self):
+        return len(self.steps)
+
+    def snapshot(self, index):
+        """
+        Rebuild the vehicle state of the index-th recorded step
+
+        Returns:
+            Tuple (step number, VehicleArrays)
+        """
+        step, start, count = self.steps[index]
+        rows = self.rows[start:start + count]
+        codes = rows['vehicle']
+        ids = self.ids
+        arrays = VehicleArrays([ids[code] for code in codes.tolist()], rows['x'], rows['y'],
+                               rows['speed'], rows['angle'], self.lengths[codes], self.widths[codes])
+        return int(step), arrays
+
+    def __iter__(self):
+        for index in range(len(self.steps)):
+            yield self.snapshot(index)
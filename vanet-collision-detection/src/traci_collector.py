@@ -0,0 +1,77 @@
+import numpy as np
+import traci
+import traci.constants as tc
+from vehicle_arrays import VehicleArrays
+
+# Variables that change every step and are delivered through the subscription
+SUBSCRIBED_VARIABLES = (tc.VAR_POSITION, tc.VAR_SPEED, tc.VAR_ANGLE)
+
+class SubscriptionCollector:
+    """
+    Collect per-step vehicle state through TraCI subscriptions
+
+    Each vehicle is subscribed once when it first appears. SUMO then pushes the
+    subscribed variables together with the response to ``simulationStep``, so
+    reading them costs no extra round-trips. Length and width never change and
+    are fetched once per vehicle and cached.
+    """
+
+    def __init__(self, connection=None):
+        """
+        Initialize the collector
+
+        Args:
+            connection: TraCI connection to use (defaults to the global traci module,
+                        pass traci.getConnection(label) for labelled instances)
+        """
+        self.connection = connection or traci
+        self.subscribed = set()
+        self.dimensions = {}
+
+    def collect(self, vehicle_ids=None):
+        """
+        Read the current state of all vehicles into a columnar store
+
+        Args:
+            vehicle_ids: IDs of the vehicles in this step; fetched with
+                         traci.vehicle.getIDList() when omitted
+
+        Returns:
+            VehicleArrays with one row per vehicle, in vehicle_ids order
+        """
+        vehicle = self.connection.vehicle
+        if vehicle_ids is None:
+            vehicle_ids = vehicle.getIDList()
+
+        # Subscribe newly departed vehicles; the subscribe response already carries their values
+        for vehicle_id in vehicle_ids:
+            if vehicle_id not in self.subscribed:
+                vehicle.subscribe(vehicle_id, SUBSCRIBED_VARIABLES)
+                self.subscribed.add(vehicle_id)
+                self.dimensions[vehicle_id] = (vehicle.getLength(vehicle_id), vehicle.getWidth(vehicle_id))
+
+        # Forget vehicles that have left the simulation
+        if len(self.subscribed) > len(vehicle_ids):
+            present = set(vehicle_ids)
+            for vehicle_id in self.subscribed - present:
+                self.subscribed.discard(vehicle_id)
+                self.dimensions.pop(vehicle_id, None)
+
+        results = vehicle.getAllSubscriptionResults()
+
+        n = len(vehicle_ids)
+        x = np.empty(n)
+        y = np.empty(n)
+        speed = np.empty(n)
+        angle = np.empty(n)
+        length = np.empty(n)
+        width = np.empty(n)
+
+        for i, vehicle_id in enumerate(vehicle_ids):
+            values = results[vehicle_id]
+            x[i], y[i] = values[tc.VAR_POSITION]
+            speed[i] = values[tc.VAR_SPEED]
+            angle[i] = values[tc.VAR_ANGLE]
+            length[i], width[i] = self.dimensions[vehicle_id]
+
+        return VehicleArrays(vehicle_ids, x, y, speed, angle, length, width)
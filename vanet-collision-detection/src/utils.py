@@ -5,6 +5,17 @@ def calculate_distance(pos1, pos2):
     """Calculate Euclidean distance between two 2D points"""
     return math.sqrt((pos1[0] - pos2[0])**2 + (pos1[1] - pos2[1])**2)
 
+def format_sim_time(elapsed_time):
+    """Format simulation time in seconds as MM:SS.d, the timestamp used in the logs"""
+    # Round to tenths first: step times like 2.3 are stored as 2.2999..., which must not print as 00:02.2
+    tenths = int(round(elapsed_time * 10))
+    return f"{tenths // 600:02d}:{tenths // 10 % 60:02d}.{tenths % 10:01d}"
+
+def parse_sim_time(text):
+    """Parse a MM:SS.d log timestamp back into simulation seconds"""
+    minutes, seconds = text.split(":")
+    return int(minutes) * 60 + float(seconds)
+
 def calculate_angle(pos1, pos2):
     """Calculate angle between two points (in degrees)"""
     dx = pos2[0] - pos1[0]
@@ -28,13 +39,15 @@ def predict_position(position, speed, angle, time_delta):
     
     return (x, y)
 
-def calculate_ttc(p1, v1, p2, v2):
+def calculate_ttc(p1, v1, p2, v2, collision_threshold=2.5):
     """
     Calculate Time-to-Collision between two vehicles
     
     Args:
         p1, p2: Position vectors of vehicles 1 and 2
         v1, v2: Velocity vectors of vehicles 1 and 2
+        collision_threshold: Sum of the vehicle radii in meters (see swept_collision
+                             for a check on the vehicles' actual length and width)
         
     Returns:
         Time-to-Collision in seconds, or infinity if no collision
@@ -65,10 +78,6 @@ def calculate_ttc(p1, v1, p2, v2):
     closest_point = dP + t_closest * dV
     closest_distance = np.linalg.norm(closest_point)
     
-    # Define threshold for collision (sum of vehicle radii)
-    # This is a simplified approximation - real implementation would use vehicle dimensions
-    collision_threshold = 2.5  # meters
-    
     if closest_distance < collision_threshold:
         return t_closest
     else:
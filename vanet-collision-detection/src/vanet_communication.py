@@ -1,102 +1,204 @@
-import math
-import time
 import random
 import os
-from utils import calculate_distance
+import numpy as np
+from utils import format_sim_time
+from vehicle_arrays import as_vehicle_arrays
+from dissemination import (NeighborTable, direct_deliveries, single_hop_deliveries, flood_deliveries,
+                           COLLISION_WARNING, NEARBY_COLLISION)
+from log_writer import BufferedLogWriter
+from columnar_log import ColumnarLogWriter
+from collision_result import CollisionResult, SEVERITY_LEVELS
+
+# Message type labels indexed by their integer code in the binary log
+MESSAGE_TYPES = ("COLLISION_WARNING", "NEARBY_COLLISION")
+
+def random_batch(count):
+    """
+    Draw count values from the global random generator in one vectorized call
+    
+    Python's random module and NumPy's RandomState share the MT19937 generator,
+    so the values (and the generator state afterwards) are identical to calling
+    random.random() count times. Seeding with random.seed() keeps working.
+    """
+    version, state, gauss_next = random.getstate()
+    generator = np.random.RandomState()
+    generator.set_state(('MT19937', np.array(state[:-1], dtype=np.uint32), state[-1]))
+    values = generator.random_sample(count)
+    
+    _, keys, pos, _, _ = generator.get_state()
+    random.setstate((version, tuple(keys.tolist()) + (int(pos),), gauss_next))
+    return values
 
 class VanetNetwork:
-    def __init__(self, transmission_range=100.0, packet_loss_rate=0.05):
+    def __init__(self, transmission_range=100.0, packet_loss_rate=0.05, log_format="csv",
+                 max_hops=1, hop_latency=0.002, log_dir="data"):
         """
         Initialize VANET network simulation
         
         Args:
             transmission_range: Maximum communication range between vehicles in meters
             packet_loss_rate: Probability of packet loss in wireless transmission
+            log_format: "csv" for the text log, "columnar" for the binary record log
+            log_dir: Directory the log file is written to
+            max_hops: 1 for direct warnings from the pair vehicles only; larger values
+                      relay warnings over up to max_hops hops with duplicate suppression
+            hop_latency: Latency of one relay hop in seconds (multi-hop mode)
         """
+        if log_format not in ("csv", "columnar"):
+            raise ValueError(f"Unknown log format: {log_format}")
+        
         self.transmission_range = transmission_range
         self.packet_loss_rate = packet_loss_rate
-        self.log_file = "data/communication_log.txt"
+        self.max_hops = max_hops
+        self.hop_latency = hop_latency
+        self.log_format = log_format
+        self.log_file = os.path.join(log_dir, "communication_log.txt" if log_format == "csv" else "communication_log.bin")
         self.step = 0
         self.step_length = 0.1  # Default SUMO step length in seconds
+        self.messages_sent = 0
+        self.messages_delivered = 0
+        self.relayed_by_hop = np.zeros(max_hops + 1, dtype=np.int64)  # Delivered relay copies per hop count
+        # Optional callable(elapsed_time, ids, sender, receiver, message_type, severity, success)
+        # receiving every batch of deliveries, e.g. LogAnalytics.observe_deliveries
+        self.delivery_listener = None
+        self.profiler = None  # Optional StepProfiler; log writes are charged to its logging stage
         
         # Create data directory if it doesn't exist
-        os.makedirs("data", exist_ok=True)
+        os.makedirs(log_dir, exist_ok=True)
         
         # Initialize log file - UPDATED to include severity and distance
-        with open(self.log_file, 'w') as f:
-            f.write("Timestamp,Sender,Receiver,MessageType,Severity,Distance,Success\n")
+        if log_format == "csv":
+            self.log_writer = BufferedLogWriter(self.log_file, "Timestamp,Sender,Receiver,MessageType,Severity,Distance,Success\n")
+        else:
+            self.log_writer = ColumnarLogWriter(self.log_file, "communication",
+                                                {"message_type": MESSAGE_TYPES, "severity": SEVERITY_LEVELS})
     
     def send_warnings(self, vehicles_data, collision_pairs):
         """
         Simulate warning message dissemination in VANET
         
         Args:
-            vehicles_data: Dictionary with vehicle information
-            collision_pairs: List of tuples (v1, v2, ttc) with potential collisions
+            vehicles_data: Dictionary with vehicle information, or a VehicleArrays snapshot
+            collision_pairs: CollisionResult of the step (read as is), or a list of
+                             tuples (v1, v2, ttc) with potential collisions
+            
+        Returns:
+            In multi-hop mode, a FloodResult with the hop count and latency of every
+            relayed delivery (event indexes collision_pairs); None otherwise
         """
         self.step += 1
         
-        # Calculate simulation time from step number
-        elapsed_time = self.step * self.step_length
-        formatted_time = f"{int(elapsed_time/60):02d}:{int(elapsed_time%60):02d}.{int((elapsed_time%1)*10):01d}"
+        if not collision_pairs:
+            return
         
-        for v1_id, v2_id, ttc in collision_pairs:
-            # Calculate distance between vehicles
-            distance = calculate_distance(vehicles_data[v1_id]['position'], vehicles_data[v2_id]['position'])
-            
-            # Determine severity based on TTC and relative speed
-            rel_speed = abs(vehicles_data[v1_id]['speed'] - vehicles_data[v2_id]['speed'])
-            if ttc < 1.0:
-                if rel_speed > 10.0:
-                    severity = "CRITICAL"
-                else:
-                    severity = "HIGH"
-            elif ttc < 2.0:
-                severity = "MEDIUM"
-            else:
-                severity = "LOW"
-            
-            # Direct communication between the two vehicles that may collide
-            self._send_message(vehicles_data, formatted_time, v1_id, v2_id, "COLLISION_WARNING", severity, distance)
-            self._send_message(vehicles_data, formatted_time, v2_id, v1_id, "COLLISION_WARNING", severity, distance)
-            
-            # Multi-hop dissemination to nearby vehicles
-            for v3_id in vehicles_data:
-                if v3_id != v1_id and v3_id != v2_id:
-                    # Calculate distance for the nearby vehicle
-                    v3_to_v1_distance = calculate_distance(vehicles_data[v3_id]['position'], vehicles_data[v1_id]['position'])
-                    v3_to_v2_distance = calculate_distance(vehicles_data[v3_id]['position'], vehicles_data[v2_id]['position'])
-                    
-                    # Vehicle 3 can relay warnings if it's connected to either v1 or v2
-                    if self._can_communicate(vehicles_data, v1_id, v3_id):
-                        self._send_message(vehicles_data, formatted_time, v1_id, v3_id, "NEARBY_COLLISION", severity, v3_to_v1_distance)
-                    
-                    if self._can_communicate(vehicles_data, v2_id, v3_id):
-                        self._send_message(vehicles_data, formatted_time, v2_id, v3_id, "NEARBY_COLLISION", severity, v3_to_v2_distance)
-    
-    def _can_communicate(self, vehicles_data, v1_id, v2_id):
-        """Check if two vehicles can communicate based on distance"""
-        if v1_id not in vehicles_data or v2_id not in vehicles_data:
-            return False
-            
-        v1_pos = vehicles_data[v1_id]['position']
-        v2_pos = vehicles_data[v2_id]['position']
+        # Pair rows, distances and severities come from the detector's result
+        if isinstance(collision_pairs, CollisionResult):
+            result = collision_pairs
+        else:
+            result = CollisionResult.from_pairs(as_vehicle_arrays(vehicles_data), collision_pairs)
+        
+        # Timestamp of the detector's step, so both logs share one clock; otherwise from our own call count
+        elapsed_time = result.time if result.time is not None else self.step * self.step_length
+        formatted_time = format_sim_time(elapsed_time)
+        arrays = result.arrays
+        pair_rows1, pair_rows2, severity = result.idx1, result.idx2, result.severity
+        
+        # In-range neighbour lists are computed once per step and shared by all pairs
+        table = NeighborTable(arrays, self.transmission_range)
+        if self.max_hops > 1:
+            return self._flood_warnings(table, arrays, pair_rows1, pair_rows2, result.distance, severity,
+                                        elapsed_time, formatted_time)
         
-        distance = calculate_distance(v1_pos, v2_pos)
+        pair, sender, receiver, message_type, distance = single_hop_deliveries(
+            table, arrays, pair_rows1, pair_rows2, result.distance)
         
-        return distance <= self.transmission_range
+        # One packet-loss draw per delivery, in delivery order
+        success = random_batch(len(pair)) > self.packet_loss_rate
+        self._log_deliveries(elapsed_time, formatted_time, arrays.ids, sender, receiver,
+                             message_type, severity[pair], distance, success)
     
-    def _send_message(self, vehicles_data, timestamp, sender_id, receiver_id, message_type, severity, distance):
-        """Simulate sending a message between vehicles with severity and distance info"""
-        # Check if communication is possible
-        if not self._can_communicate(vehicles_data, sender_id, receiver_id):
-            return False
+    def _flood_warnings(self, table, arrays, pair_rows1, pair_rows2, pair_distance, severity,
+                        elapsed_time, formatted_time):
+        """Direct warnings between pair vehicles followed by multi-hop relaying to everyone else"""
+        pair, sender, receiver, distance = direct_deliveries(table, arrays, pair_rows1, pair_rows2, pair_distance)
+        success = random_batch(len(pair)) > self.packet_loss_rate
+        self._log_deliveries(elapsed_time, formatted_time, arrays.ids, sender, receiver,
+                             np.full(len(pair), COLLISION_WARNING, dtype=np.uint8), severity[pair],
+                             distance, success)
         
-        # Simulate packet loss
-        success = random.random() > self.packet_loss_rate
+        flood = flood_deliveries(table, pair_rows1, pair_rows2, self.max_hops, random_batch,
+                                 self.packet_loss_rate, self.hop_latency)
+        self._log_deliveries(elapsed_time, formatted_time, arrays.ids, flood.sender, flood.receiver,
+                             np.full(len(flood.event), NEARBY_COLLISION, dtype=np.uint8), severity[flood.event],
+                             flood.distance, flood.success)
+        self.relayed_by_hop += np.bincount(flood.hops[flood.success], minlength=len(self.relayed_by_hop))
+        return flood
+    
+    def flood_summary(self):
+        """
+        Hop count and latency distribution of the delivered relay copies (multi-hop mode)
         
-        # Log communication with severity and distance
-        with open(self.log_file, 'a') as f:
-            f.write(f"{timestamp},{sender_id},{receiver_id},{message_type},{severity},{distance:.2f},{success}\n")
+        Returns:
+            Dictionary with the delivered relay count, the count and latency per hop
+            and the mean latency in milliseconds
+        """
+        hops = np.arange(len(self.relayed_by_hop))
+        delivered = int(self.relayed_by_hop.sum())
+        mean_hops = float(hops @ self.relayed_by_hop) / delivered if delivered else 0.0
+        return {
+            "delivered": delivered,
+            "by_hop": {int(hop): {"delivered": int(self.relayed_by_hop[hop]),
+                                  "latency_ms": hop * self.hop_latency * 1000.0}
+                       for hop in hops[1:].tolist()},
+            "mean_hops": mean_hops,
+            "mean_latency_ms": mean_hops * self.hop_latency * 1000.0,
+        }
+    
+    def format_flood_summary(self):
+        """Human-readable table of the flood summary for the console"""
+        summary = self.flood_summary()
+        lines = [f"Relayed warnings: {summary['delivered']} delivered, mean {summary['mean_hops']:.2f} hops, "
+                 f"mean latency {summary['mean_latency_ms']:.1f} ms",
+                 f"{'hops':<8}{'delivered':>12}{'share':>8}{'latency ms':>12}"]
+        for hop, stats in summary["by_hop"].items():
+            share = stats["delivered"] / summary["delivered"] if summary["delivered"] else 0.0
+            lines.append(f"{hop:<8}{stats['delivered']:>12}{share:>8.1%}{stats['latency_ms']:>12.1f}")
+        return "\n".join(lines)
+    
+    def _log_deliveries(self, elapsed_time, formatted_time, ids, sender, receiver,
+                        message_type, severity, distance, success):
+        """Write a batch of deliveries to the communication log"""
+        if len(sender) == 0:
+            return
+        self.messages_sent += len(sender)
+        self.messages_delivered += int(np.count_nonzero(success))
+        if self.delivery_listener is not None:
+            self.delivery_listener(elapsed_time, ids, sender, receiver, message_type, severity, success)
+        if self.profiler is not None:
+            self.profiler.lap("disseminate")
+        self._write_deliveries(elapsed_time, formatted_time, ids, sender, receiver,
+                               message_type, severity, distance, success)
+        if self.profiler is not None:
+            self.profiler.lap("logging")
+    
+    def _write_deliveries(self, elapsed_time, formatted_time, ids, sender, receiver,
+                          message_type, severity, distance, success):
+        """Hand a batch of deliveries to the log writer"""
+        if self.log_format == "columnar":
+            intern = self.log_writer.intern
+            codes = np.zeros(len(ids), dtype=np.int32)
+            involved = np.unique(np.concatenate((sender, receiver)))
+            codes[involved] = [intern(ids[i]) for i in involved.tolist()]
+            self.log_writer.extend(time=elapsed_time, sender=codes[sender], receiver=codes[receiver],
+                                   message_type=message_type, severity=severity,
+                                   distance=distance, success=success)
+            return
         
-        return success
\ No newline at end of file
+        self.log_writer.write(''.join(
+            f"{formatted_time},{ids[s]},{ids[r]},{MESSAGE_TYPES[m]},{SEVERITY_LEVELS[v]},{d:.2f},{ok}\n"
+            for s, r, m, v, d, ok in zip(sender.tolist(), receiver.tolist(), message_type.tolist(),
+                                         severity.tolist(), distance.tolist(), success.tolist())))
+    
+    def close(self):
+        """Flush buffered log records and close the log file"""
+        self.log_writer.close()
\ No newline at end of file
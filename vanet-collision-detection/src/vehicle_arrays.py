@@ -0,0 +1,98 @@
+import numpy as np
+
+class VehicleArrays:
+    """
+    Columnar snapshot of all vehicles in one simulation step
+
+    Every attribute is a contiguous NumPy array indexed by the vehicle's
+    position in ``ids``, so whole-step calculations can run as array
+    operations instead of per-vehicle dictionary lookups.
+    """
+
+    def __init__(self, ids, x, y, speed, angle, length, width):
+        """
+        Initialize the store from already aligned columns
+
+        Args:
+            ids: List of vehicle IDs, one per row
+            x, y: Vehicle positions in meters
+            speed: Vehicle speeds in m/s
+            angle: SUMO headings in degrees (clockwise from north)
+            length, width: Vehicle dimensions in meters
+        """
+        self.ids = list(ids)
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        self.y = np.ascontiguousarray(y, dtype=np.float64)
+        self.speed = np.ascontiguousarray(speed, dtype=np.float64)
+        self.angle = np.ascontiguousarray(angle, dtype=np.float64)
+        self.length = np.ascontiguousarray(length, dtype=np.float64)
+        self.width = np.ascontiguousarray(width, dtype=np.float64)
+        self.row_of = {vehicle_id: i for i, vehicle_id in enumerate(self.ids)}
+
+        # Convert angles from SUMO (clockwise from north) to standard math (counterclockwise from east)
+        heading = np.radians((90 - self.angle) % 360)
+        self.hx = np.cos(heading)  # Unit heading vector
+        self.hy = np.sin(heading)
+        self.vx = self.speed * self.hx
+        self.vy = self.speed * self.hy
+
+    @classmethod
+    def from_vehicles_data(cls, vehicles_data):
+        """
+        Pack the per-vehicle dictionaries collected in the main loop into arrays
+
+        Args:
+            vehicles_data: Dictionary with vehicle IDs as keys and position/velocity as values
+
+        Returns:
+            VehicleArrays with rows in the dictionary's iteration order
+        """
+        ids = list(vehicles_data.keys())
+        n = len(ids)
+        x = np.empty(n)
+        y = np.empty(n)
+        speed = np.empty(n)
+        angle = np.empty(n)
+        length = np.zeros(n)
+        width = np.zeros(n)
+
+        for i, vehicle_id in enumerate(ids):
+            vehicle = vehicles_data[vehicle_id]
+            x[i], y[i] = vehicle['position']
+            speed[i] = vehicle['speed']
+            angle[i] = vehicle['angle']
+            length[i] = vehicle.get('length', 0.0)
+            width[i] = vehicle.get('width', 0.0)
+
+        return cls(ids, x, y, speed, angle, length, width)
+
+    def to_vehicles_data(self):
+        """Expand the arrays back into the per-vehicle dictionary layout"""
+        vehicles_data = {}
+        for i, vehicle_id in enumerate(self.ids):
+            vehicles_data[vehicle_id] = {
+                'position': (float(self.x[i]), float(self.y[i])),
+                'speed': float(self.speed[i]),
+                'angle': float(self.angle[i]),
+                'length': float(self.length[i]),
+                'width': float(self.width[i])
+            }
+        return vehicles_data
+
+    def position(self, vehicle_id):
+        """Return the (x, y) position of a vehicle"""
+        i = self.row_of[vehicle_id]
+        return (float(self.x[i]), float(self.y[i]))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, vehicle_id):
+        return vehicle_id in self.row_of
+
+
+def as_vehicle_arrays(vehicles):
+    """Accept either a VehicleArrays snapshot or a vehicles_data dictionary"""
+    if isinstance(vehicles, VehicleArrays):
+        return vehicles
+    return VehicleArrays.from_vehicles_data(vehicles)
@@ -0,0 +1,70 @@
+import numpy as np
+from alert_episodes import EpisodeTracker, OPEN, ESCALATE, CLOSE
+from collision_result import CollisionResult
+from gui_updates import AlertRingBuffer
+from vehicle_arrays import VehicleArrays
+
+ARRAYS = VehicleArrays(["a", "b", "c"], [0.0, 10.0, 20.0], [0.0, 0.0, 0.0], [10.0, 5.0, 5.0],
+                       [90.0, 90.0, 90.0], [5.0, 5.0, 5.0], [1.8, 1.8, 1.8])
+
+def result(*pairs):
+    """CollisionResult of (row1, row2, ttc, severity) tuples"""
+    idx1, idx2, ttc, severity = (list(column) for column in zip(*pairs)) if pairs else ([], [], [], [])
+    return CollisionResult(ARRAYS, np.array(idx1, dtype=np.int64), np.array(idx2, dtype=np.int64),
+                           np.array(ttc, dtype=np.float64), np.full(len(ttc), 10.0), np.full(len(ttc), 5.0),
+                           np.array(severity, dtype=np.int64))
+
+def events(tracker, time, step_result):
+    return [(event.event, event.vehicle1, event.vehicle2) for event in tracker.update(time, step_result)]
+
+def test_episode_open_escalate_close():
+    tracker = EpisodeTracker(clear_steps=3)
+
+    assert events(tracker, 0.1, result((0, 1, 2.5, 0))) == [(OPEN, "a", "b")]
+    np.testing.assert_array_equal(tracker.alert_rows, [0])
+
+    # Rising severity escalates, the second pair opens its own episode
+    assert events(tracker, 0.2, result((1, 2, 2.8, 0), (0, 1, 0.8, 2))) == [(OPEN, "b", "c"), (ESCALATE, "a", "b")]
+    np.testing.assert_array_equal(tracker.alert_rows, [0, 1])
+
+    # Falling severity and a swapped row order are the same episode, without events
+    assert events(tracker, 0.3, result((1, 0, 1.5, 1))) == []
+    assert len(tracker.alert_rows) == 0
+
+    # a-b was last seen at step 3 and closes after three clear steps; b-c after step 2
+    assert events(tracker, 0.4, result()) == []
+    assert events(tracker, 0.5, result()) == [(CLOSE, "b", "c")]
+    closed = tracker.update(0.6, result())
+    assert [(event.event, event.vehicle1, event.vehicle2) for event in closed] == [(CLOSE, "a", "b")]
+    assert closed[0].start == 0.1
+    assert closed[0].min_ttc == 0.8
+    assert closed[0].max_severity == 2
+    assert closed[0].steps == 3
+    assert (tracker.opened, tracker.closed) == (2, 2)
+
+def test_episode_reopens_and_finish_closes():
+    tracker = EpisodeTracker(clear_steps=1)
+    assert events(tracker, 0.1, result((0, 1, 2.0, 0))) == [(OPEN, "a", "b")]
+    assert events(tracker, 0.2, result()) == [(CLOSE, "a", "b")]
+    assert events(tracker, 0.3, result((0, 1, 2.0, 0))) == [(OPEN, "a", "b")]
+    assert [(event.event, event.time) for event in tracker.finish(0.4)] == [(CLOSE, 0.4)]
+    assert not tracker.active
+
+def test_ring_buffer_coalesces_by_key():
+    buffer = AlertRingBuffer(capacity=10)
+    buffer.put(("a", "b"), (1,))
+    buffer.put(("b", "c"), (2,))
+    buffer.put(("a", "b"), (3,))
+
+    # The repeated key keeps one row, with the newest values, moved behind the others
+    assert len(buffer) == 2
+    assert buffer.drain() == [(("b", "c"), (2,)), (("a", "b"), (3,))]
+    assert len(buffer) == 0
+
+def test_ring_buffer_drops_oldest_beyond_capacity():
+    buffer = AlertRingBuffer(capacity=3)
+    for i in range(5):
+        buffer.put(i, (i,))
+    assert buffer.dropped == 2
+    assert buffer.drain(limit=2) == [(2, (2,)), (3, (3,))]
+    assert buffer.drain() == [(4, (4,))]
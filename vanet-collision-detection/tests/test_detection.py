@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from collision_detection import CollisionDetector
+from sharded_detection import ShardedDetection
+from spatial_index import UniformGrid
+from swept_collision import swept_obb_ttc, vehicle_boxes
+from synthetic_traffic import SyntheticTraffic, SCENARIOS
+from vehicle_arrays import VehicleArrays
+
+def trajectory(scenario, vehicle_count=150, steps=5, seed=1):
+    return list(SyntheticTraffic(scenario, vehicle_count, density=40.0, heading_noise=5.0, seed=seed).steps(steps))
+
+def detect_all(detector, steps):
+    results = [detector.detect_collisions(arrays) for arrays in steps]
+    detector.close()
+    return results
+
+def assert_same_results(expected, actual):
+    assert len(expected) == len(actual)
+    for a, b in zip(expected, actual):
+        np.testing.assert_array_equal(a.idx1, b.idx1)
+        np.testing.assert_array_equal(a.idx2, b.idx2)
+        np.testing.assert_allclose(a.ttc, b.ttc, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(a.distance, b.distance, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(a.relative_speed, b.relative_speed, rtol=1e-9, atol=1e-9)
+        np.testing.assert_array_equal(a.severity, b.severity)
+        assert a.time == b.time
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_vectorized_matches_scalar(scenario, tmp_path):
+    steps = trajectory(scenario)
+    scalar = detect_all(CollisionDetector(backend="scalar", log_dir=str(tmp_path / "scalar")), steps)
+    vectorized = detect_all(CollisionDetector(backend="vectorized", log_dir=str(tmp_path / "vectorized")), steps)
+    assert sum(len(result) for result in scalar) > 0
+    assert_same_results(scalar, vectorized)
+
+@pytest.mark.parametrize("ttc_model", ["point", "obb"])
+def test_sharded_matches_vectorized(ttc_model, tmp_path):
+    steps = trajectory("grid", vehicle_count=600)
+    vectorized = detect_all(CollisionDetector(backend="vectorized", ttc_model=ttc_model,
+                                              log_dir=str(tmp_path / "vectorized")), steps)
+    # Send every step through the worker pool, not the in-process fallback for small steps
+    sharded = detect_all(CollisionDetector(backend="sharded", workers=2, shard_min_vehicles=0, ttc_model=ttc_model,
+                                           log_dir=str(tmp_path / "sharded")), steps)
+    assert_same_results(vectorized, sharded)
+
+def test_sharded_fallback_matches_pool():
+    arrays = trajectory("highway", vehicle_count=400, steps=1)[0]
+    pooled = ShardedDetection(workers=2, min_vehicles=0)
+    in_process = ShardedDetection(workers=2)
+    try:
+        for a, b in zip(pooled.evaluate(arrays, 30.0, 3.0), in_process.evaluate(arrays, 30.0, 3.0)):
+            np.testing.assert_array_equal(a, b)
+        assert pooled.candidates == in_process.candidates
+        assert in_process.pool is None
+    finally:
+        pooled.close()
+        in_process.close()
+
+def test_workers_require_sharded_backend(tmp_path):
+    with pytest.raises(ValueError):
+        CollisionDetector(backend="vectorized", workers=2, log_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        CollisionDetector(backend="vectorized", shard_min_vehicles=0, log_dir=str(tmp_path))
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+@pytest.mark.parametrize("radius", [5.0, 30.0, 75.0])
+def test_grid_pairs_match_brute_force(scenario, radius):
+    arrays = trajectory(scenario, vehicle_count=300, steps=1)[0]
+    idx1, idx2, distance = UniformGrid.from_arrays(arrays, 30.0).pairs_within(radius)
+
+    i, j = np.triu_indices(len(arrays), k=1)
+    brute = np.hypot(arrays.x[j] - arrays.x[i], arrays.y[j] - arrays.y[i])
+    near = brute <= radius
+
+    # Brute force pairs come out in row-major order, the order the grid promises
+    np.testing.assert_array_equal(idx1, i[near])
+    np.testing.assert_array_equal(idx2, j[near])
+    np.testing.assert_allclose(distance, brute[near])
+
+def boxes_overlap(arrays, idx1, idx2, t, slack=0.0):
+    """Separating axis test of the boxes moved along their velocities for t seconds"""
+    cx1, cy1, hx1, hy1, hl1, hw1 = vehicle_boxes(arrays, idx1)
+    cx2, cy2, hx2, hy2, hl2, hw2 = vehicle_boxes(arrays, idx2)
+    dx = cx2 + arrays.vx[idx2] * t - cx1 - arrays.vx[idx1] * t
+    dy = cy2 + arrays.vy[idx2] * t - cy1 - arrays.vy[idx1] * t
+    overlap = np.ones(len(idx1), dtype=bool)
+    for ax, ay in ((hx1, hy1), (-hy1, hx1), (hx2, hy2), (-hy2, hx2)):
+        reach = (np.abs(ax * hx1 + ay * hy1) * hl1 + np.abs(-ax * hy1 + ay * hx1) * hw1 +
+                 np.abs(ax * hx2 + ay * hy2) * hl2 + np.abs(-ax * hy2 + ay * hx2) * hw2)
+        overlap &= np.abs(ax * dx + ay * dy) <= reach + slack
+    return overlap
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_swept_obb_matches_sampled_reference(scenario):
+    horizon = 3.0
+    arrays = trajectory(scenario, vehicle_count=400, steps=1, seed=7)[0]
+    idx1, idx2, _ = UniformGrid.from_arrays(arrays, 30.0).pairs_within(30.0)
+    ttc = swept_obb_ttc(arrays, idx1, idx2, horizon)
+    assert np.isfinite(ttc).any()
+
+    samples = np.linspace(0.0, horizon, 601)
+    overlap = np.array([boxes_overlap(arrays, idx1, idx2, t) for t in samples])
+    hit = overlap.any(axis=0)
+    first = np.where(hit, samples[np.argmax(overlap, axis=0)], np.inf)
+
+    # Every sampled contact is found, no earlier than the analytic contact time
+    assert np.all(np.isfinite(ttc[hit]))
+    assert np.all(ttc[hit] <= first[hit] + 1e-9)
+    # The analytic contact time is a real contact, and no sample before it overlaps
+    touching = np.isfinite(ttc)
+    assert np.all(boxes_overlap(arrays, idx1[touching], idx2[touching], ttc[touching], slack=1e-6))
+    before = samples[:, None] < ttc[touching] - 1e-6
+    assert not np.any(overlap[:, touching] & before)
+
+def test_swept_obb_head_on():
+    # Front bumpers 20 m apart, closing at 20 m/s along the same line
+    arrays = VehicleArrays(["a", "b"], [0.0, 20.0], [0.0, 0.0], [10.0, 10.0], [90.0, 270.0], [5.0, 5.0], [1.8, 1.8])
+    ttc = swept_obb_ttc(arrays, np.array([0]), np.array([1]), 3.0)
+    np.testing.assert_allclose(ttc, [1.0])
+
+    # Same pair offset sideways by more than a vehicle width never touches
+    arrays = VehicleArrays(["a", "b"], [0.0, 20.0], [0.0, 2.0], [10.0, 10.0], [90.0, 270.0], [5.0, 5.0], [1.8, 1.8])
+    assert np.isinf(swept_obb_ttc(arrays, np.array([0]), np.array([1]), 3.0)[0])
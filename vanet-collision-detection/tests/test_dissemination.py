@@ -0,0 +1,133 @@
+import math
+import random
+import numpy as np
+import pytest
+from collision_detection import CollisionDetector
+from dissemination import NeighborTable, single_hop_deliveries, flood_deliveries, COLLISION_WARNING, NEARBY_COLLISION
+from synthetic_traffic import SyntheticTraffic, SCENARIOS
+from vanet_communication import random_batch
+from vehicle_arrays import VehicleArrays
+
+TRANSMISSION_RANGE = 100.0
+
+def step_with_pairs(scenario, tmp_path, vehicle_count=200):
+    """Vehicle arrays of a synthetic step and the row indices of its collision pairs"""
+    arrays = next(iter(SyntheticTraffic(scenario, vehicle_count, density=40.0, heading_noise=5.0, seed=4).steps(1)))
+    detector = CollisionDetector(log_dir=str(tmp_path))
+    result = detector.detect_collisions(arrays)
+    detector.close()
+    return arrays, result.idx1, result.idx2
+
+def baseline_deliveries(arrays, pair_rows1, pair_rows2, transmission_range):
+    """The per-vehicle scan of the original VanetNetwork.send_warnings, on rows instead of IDs"""
+    def distance(a, b):
+        return math.hypot(arrays.x[a] - arrays.x[b], arrays.y[a] - arrays.y[b])
+
+    deliveries = []
+    for pair, (v1, v2) in enumerate(zip(pair_rows1.tolist(), pair_rows2.tolist())):
+        if distance(v1, v2) <= transmission_range:
+            deliveries.append((pair, v1, v2, COLLISION_WARNING, distance(v1, v2)))
+            deliveries.append((pair, v2, v1, COLLISION_WARNING, distance(v1, v2)))
+        for v3 in range(len(arrays)):
+            if v3 != v1 and v3 != v2:
+                if distance(v1, v3) <= transmission_range:
+                    deliveries.append((pair, v1, v3, NEARBY_COLLISION, distance(v1, v3)))
+                if distance(v2, v3) <= transmission_range:
+                    deliveries.append((pair, v2, v3, NEARBY_COLLISION, distance(v2, v3)))
+    return deliveries
+
+def line_arrays(points):
+    """VehicleArrays of parked vehicles v0, v1, ... at the given (x, y) positions"""
+    n = len(points)
+    return VehicleArrays([f"v{i}" for i in range(n)], [p[0] for p in points], [p[1] for p in points],
+                         [0.0] * n, [0.0] * n, [5.0] * n, [1.8] * n)
+
+def no_loss(count):
+    return np.ones(count)
+
+def reference_flood(arrays, pair_rows1, pair_rows2, max_hops, transmission_range):
+    """Breadth-first flood of every event on its own, without packet loss"""
+    def distance(a, b):
+        return math.hypot(arrays.x[a] - arrays.x[b], arrays.y[a] - arrays.y[b])
+
+    deliveries = []
+    for event, (v1, v2) in enumerate(zip(pair_rows1.tolist(), pair_rows2.tolist())):
+        informed = {v1, v2}
+        frontier = [v1, v2]
+        for hop in range(1, max_hops + 1):
+            # Closest relay per receiver, ties to the lowest sender row
+            best = {}
+            for sender in frontier:
+                for receiver in range(len(arrays)):
+                    d = distance(sender, receiver)
+                    if receiver not in informed and receiver != sender and d <= transmission_range:
+                        best[receiver] = min(best.get(receiver, (d, sender)), (d, sender))
+            deliveries += [(hop, event, receiver, sender) for receiver, (d, sender) in best.items()]
+            informed.update(best)
+            frontier = sorted(best)
+    return sorted(deliveries)
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_single_hop_matches_baseline_loop(scenario, tmp_path):
+    arrays, pair_rows1, pair_rows2 = step_with_pairs(scenario, tmp_path)
+    assert len(pair_rows1) > 0
+    table = NeighborTable(arrays, TRANSMISSION_RANGE)
+
+    pair, sender, receiver, message_type, distance = single_hop_deliveries(table, arrays, pair_rows1, pair_rows2)
+    expected = baseline_deliveries(arrays, pair_rows1, pair_rows2, TRANSMISSION_RANGE)
+
+    # Same deliveries in the same order, so packet-loss draws line up with the baseline
+    assert list(zip(pair.tolist(), sender.tolist(), receiver.tolist(), message_type.tolist())) == \
+        [delivery[:4] for delivery in expected]
+    np.testing.assert_allclose(distance, [delivery[4] for delivery in expected], rtol=1e-9)
+
+@pytest.mark.parametrize("count", [0, 1, 625, 2000])
+def test_random_batch_matches_random_module(count):
+    random.seed(11)
+    values = random_batch(count)
+    after = random.random()
+
+    random.seed(11)
+    expected = [random.random() for _ in range(count)]
+
+    assert values.tolist() == expected
+    # The global generator continues where count random.random() calls would leave it
+    assert after == random.random()
+
+def test_flood_stops_at_hop_limit():
+    # A chain where every vehicle only reaches its direct neighbours
+    arrays = line_arrays([(50.0 * i, 0.0) for i in range(6)])
+    table = NeighborTable(arrays, 60.0)
+    flood = flood_deliveries(table, np.array([0]), np.array([1]), 3, no_loss, 0.05, 0.002)
+
+    assert flood.receiver.tolist() == [2, 3, 4]
+    assert flood.sender.tolist() == [1, 2, 3]
+    assert flood.hops.tolist() == [1, 2, 3]
+    np.testing.assert_allclose(flood.latency, [0.002, 0.004, 0.006])
+
+def test_flood_retries_lost_receivers_through_other_relays():
+    # v2 and v3 are both reached from v1 at hop 1; v3 also reaches v2
+    arrays = line_arrays([(0.0, 0.0), (10.0, 0.0), (60.0, 0.0), (35.0, 45.0)])
+    table = NeighborTable(arrays, 65.0)
+    draws = iter([0.0, 1.0, 1.0])
+    flood = flood_deliveries(table, np.array([0]), np.array([1]), 3,
+                             lambda count: np.array([next(draws) for _ in range(count)]), 0.5, 0.002)
+
+    # One copy per receiver from the closest relay; the lost v2 is reached again via v3
+    assert list(zip(flood.sender.tolist(), flood.receiver.tolist(), flood.hops.tolist(),
+                    flood.success.tolist())) == [(1, 2, 1, False), (1, 3, 1, True), (3, 2, 2, True)]
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+@pytest.mark.parametrize("max_hops", [2, 4])
+def test_flood_matches_per_event_reference(scenario, max_hops, tmp_path):
+    arrays, pair_rows1, pair_rows2 = step_with_pairs(scenario, tmp_path, vehicle_count=120)
+    table = NeighborTable(arrays, TRANSMISSION_RANGE)
+    flood = flood_deliveries(table, pair_rows1, pair_rows2, max_hops, no_loss, 0.05, 0.002)
+
+    deliveries = list(zip(flood.hops.tolist(), flood.event.tolist(), flood.receiver.tolist(), flood.sender.tolist()))
+    assert deliveries == reference_flood(arrays, pair_rows1, pair_rows2, max_hops, TRANSMISSION_RANGE)
+    # Duplicate suppression: every vehicle receives each event at most once, pair vehicles never
+    received = set(zip(flood.event.tolist(), flood.receiver.tolist()))
+    assert len(received) == len(flood.event)
+    pair_vehicles = set(enumerate(pair_rows1.tolist())) | set(enumerate(pair_rows2.tolist()))
+    assert not received & pair_vehicles
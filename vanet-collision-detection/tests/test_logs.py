@@ -0,0 +1,88 @@
+import os
+import random
+import time
+import pytest
+from collision_detection import CollisionDetector
+from collision_result import SEVERITY_LEVELS
+from columnar_log import ColumnarLog, ColumnarLogWriter
+from log_writer import BufferedLogWriter, close_all_writers
+from synthetic_traffic import SyntheticTraffic
+from vanet_communication import VanetNetwork
+
+def run(log_format, log_dir, alerts, max_hops):
+    """Detect and disseminate over a fixed trajectory, returning the written log paths"""
+    random.seed(3)
+    detector = CollisionDetector(log_format=log_format, log_dir=log_dir, alerts=alerts)
+    vanet = VanetNetwork(log_format=log_format, log_dir=log_dir, max_hops=max_hops)
+    for arrays in SyntheticTraffic("grid", 300, density=40.0, heading_noise=5.0, seed=2).steps(30):
+        detector.detect_collisions(arrays)
+        if detector.alerts:
+            vanet.send_warnings(arrays, detector.alerts)
+    detector.close()
+    vanet.close()
+    return detector.log_file, vanet.log_file
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+@pytest.mark.parametrize("alerts,max_hops", [("raw", 1), ("raw", 3), ("episodes", 1)])
+def test_columnar_export_matches_csv_log(alerts, max_hops, tmp_path):
+    csv_logs = run("csv", str(tmp_path / "csv"), alerts, max_hops)
+    columnar_logs = run("columnar", str(tmp_path / "columnar"), alerts, max_hops)
+
+    for csv_path, binary_path in zip(csv_logs, columnar_logs):
+        expected = read_bytes(csv_path)
+        assert expected.count(b"\n") > 1
+        exported = os.path.join(str(tmp_path), os.path.basename(binary_path) + ".csv")
+        # A small chunk size also covers the chunk boundaries of the export
+        ColumnarLog(binary_path).export_csv(exported, chunk_size=7)
+        assert read_bytes(exported) == expected
+
+def test_columnar_log_readable_before_flush_and_closed_at_exit(tmp_path):
+    path = str(tmp_path / "collision_log.bin")
+    writer = ColumnarLogWriter(path, "collision", {"severity": SEVERITY_LEVELS})
+    # The sidecar exists from the start, so an unflushed log still opens, empty
+    assert len(ColumnarLog(path)) == 0
+
+    writer.append((0.1, writer.intern("a"), writer.intern("b"), 1.5, 12.0, 2))
+    # Writers left open are flushed and closed by the exit-time hook
+    close_all_writers()
+    log = ColumnarLog(path)
+    assert len(log) == 1
+    assert list(log.ids[log.records["vehicle2"]]) == ["b"]
+    writer.close()
+
+def test_buffered_writer_bytes_match_direct_appends(tmp_path):
+    lines = [f"00:{i // 10:02d}.{i % 10},v{i},v{i + 1},{i * 0.37:.2f}\n" for i in range(500)]
+    # Multi-line writes and a small buffer cover hand-offs inside a write and back-pressure
+    writes = lines[:7] + [''.join(lines[7:40])] + lines[40:]
+    path = str(tmp_path / "log.txt")
+    with BufferedLogWriter(path, "Header\n", buffer_size=16, max_pending=2) as writer:
+        for text in writes:
+            writer.write(text)
+
+    assert read_bytes(path) == ("Header\n" + ''.join(lines)).encode()
+
+def test_buffered_writer_flushes_after_interval(tmp_path):
+    path = str(tmp_path / "log.txt")
+    writer = BufferedLogWriter(path, "Header\n", buffer_size=1000, flush_interval=0.05)
+    writer.write("line\n")
+    # Far below buffer_size, so only the flush interval writes the line
+    deadline = time.monotonic() + 5.0
+    while read_bytes(path) != b"Header\nline\n" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert read_bytes(path) == b"Header\nline\n"
+    writer.close()
+
+@pytest.mark.skipif(not os.path.exists("/dev/full"), reason="needs /dev/full")
+def test_buffered_writer_raises_write_errors():
+    writer = BufferedLogWriter("/dev/full", buffer_size=1)
+    writer.write("line\n")
+    # The writer thread fails with ENOSPC; the error is raised in the caller's thread
+    with pytest.raises(OSError):
+        writer.flush()
+    with pytest.raises(OSError):
+        writer.write("line\n")
+    with pytest.raises(OSError):
+        writer.close()
@@ -0,0 +1,78 @@
+import pytest
+from alert_episodes import OPEN, CLOSE
+from collision_detection import CollisionDetector
+from profiling import StepProfiler
+from step_pipeline import SerialSteps, PipelinedSteps
+from trace_recorder import TraceRecorder, TraceReader
+from vehicle_arrays import VehicleArrays
+
+# Two vehicles closing in on each other, then an empty road
+STEPS = [
+    {"a": (-5.0, 10.0), "b": (20.0, 0.0)},
+    {"a": (-4.0, 10.0), "b": (20.0, 0.0)},
+    {},
+    {},
+]
+
+class FakeVehicleDomain:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def getIDList(self):
+        return tuple(STEPS[self.connection.step])
+
+    def setColor(self, vehicle_id, color):
+        pass
+
+class FakeConnection:
+    """The part of a TraCI connection the step sources use"""
+
+    def __init__(self):
+        self.step = -1
+        self.vehicle = FakeVehicleDomain(self)
+
+    def simulationStep(self):
+        self.step += 1
+
+class FakeCollector:
+    """SubscriptionCollector stand-in reading the current step of STEPS"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def collect(self, vehicle_ids):
+        state = STEPS[self.connection.step]
+        n = len(vehicle_ids)
+        return VehicleArrays(vehicle_ids, [state[v][0] for v in vehicle_ids], [0.0] * n,
+                             [state[v][1] for v in vehicle_ids], [90.0] * n, [5.0] * n, [1.8] * n)
+
+@pytest.mark.parametrize("source", [SerialSteps, PipelinedSteps])
+def test_empty_steps_run_through_detector_and_recorder(source, tmp_path):
+    profiler = StepProfiler()
+    steps = source(FakeCollector(FakeConnection()), len(STEPS), profiler)
+    detector = CollisionDetector(log_dir=str(tmp_path), alerts="episodes", clear_steps=2)
+    recorder = TraceRecorder(str(tmp_path / "trace"))
+
+    events = []
+    step = 0
+    while True:
+        profiler.begin_step()
+        fetched = steps.next_step()
+        if fetched is None:
+            break
+        vehicle_ids, vehicles_data = fetched
+        assert isinstance(vehicles_data, VehicleArrays)
+        assert len(vehicles_data) == len(vehicle_ids)
+        recorder.record(step, vehicles_data)
+        result = detector.detect_collisions(vehicles_data)
+        events.extend((step, event.event) for event in detector.episode_events)
+        profiler.end_step(len(vehicle_ids), len(result))
+        step += 1
+    steps.close()
+    recorder.close()
+    detector.close()
+
+    # The episode closes after two clear steps, not only when the run ends
+    assert events == [(0, OPEN), (3, CLOSE)]
+    assert detector.step == len(STEPS)
+    assert [len(arrays) for _, arrays in TraceReader(str(tmp_path / "trace"))] == [2, 2, 0, 0]